@@ -1,9 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends, Body
+import json
+from contextlib import aclosing
+from fastapi import APIRouter, HTTPException, Depends, Body, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Optional
-from pydantic import BaseModel
-from app.dependencies import get_chat_service, get_youtube_service
-from app.services.chat_service import ChatService
+from pydantic import BaseModel, Field
+from app.dependencies import get_chat_service, get_socket_registry, get_youtube_service
+from app.services.chat_service import ChatService, ConversationResyncRequired
 from app.services.youtube_service import YouTubeService
+from app.services.quota import QuotaExceededError
+from app.services.sockets import (
+    SocketRegistry, CLOSE_POLICY_VIOLATION, CLOSE_RESYNC_REQUIRED, CLOSE_TRY_AGAIN_LATER
+)
 
 router = APIRouter()
 
@@ -15,12 +22,21 @@ class Message(BaseModel):
 class ChatRequest(BaseModel):
     youtube_url: str
     message: str
+    # Only read to rebuild a conversation the server no longer has
     chat_history: List[Dict[str, str]] = []
+    conversation_id: Optional[str] = None
+    # Messages of the conversation the client already has (the last seq it got)
+    last_seen_seq: Optional[int] = Field(None, ge=0)
 
 class ChatResponse(BaseModel):
     conversation_id: str
     response: str
     channel_info: Dict
+    context_tier: Optional[str] = None
+    timings: Optional[Dict] = None
+    prompt_tokens: Optional[Dict] = None
+    seq: Optional[int] = None
+    missed_messages: List[Dict[str, str]] = []
 
 class SearchRequest(BaseModel):
     query: str
@@ -44,7 +60,7 @@ async def search_channels(
     Search for YouTube channels by name or URL
     """
     try:
-        results = youtube_service.search_channels(request.query, request.max_results)
+        results = await youtube_service.search_channels(request.query, request.max_results)
         return [ChannelInfo(**channel) for channel in results]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -52,22 +68,42 @@ async def search_channels(
 @router.get("/channels/{channel_identifier}", response_model=ChannelInfo)
 async def get_channel(
     channel_identifier: str,
-    youtube_service: YouTubeService = Depends(get_youtube_service)
+    youtube_service: YouTubeService = Depends(get_youtube_service),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
     """
     Get detailed information about a YouTube channel.
     Can use channel ID (UC...) or handle (with or without @)
+    
+    Viewing a channel usually precedes chatting with it, so its transcripts
+    are prefetched in the background from the info fetched here.
     """
     try:
         channel_info = await youtube_service.get_channel_info(channel_identifier)
         if not channel_info:
             raise HTTPException(status_code=404, detail="Channel not found")
+        chat_service.schedule_warmup(channel_identifier, channel_info)
         return ChannelInfo(**channel_info)
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/channels/{channel_identifier}/warm", status_code=202)
+async def warm_channel(
+    channel_identifier: str,
+    chat_service: ChatService = Depends(get_chat_service)
+):
+    """
+    Prefetch a channel's info and transcripts ahead of the first chat message
+    """
+    return {
+        'channel': channel_identifier,
+        'status': chat_service.schedule_warmup(channel_identifier)
+    }
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_youtuber(
     chat_request: ChatRequest,
@@ -75,28 +111,153 @@ async def chat_with_youtuber(
 ):
     """
     Chat with an AI that mimics a YouTuber's style
+    
+    Send ``conversation_id`` and ``last_seen_seq`` rather than the whole
+    history; the reply carries the new ``seq`` and any messages the client
+    missed. A 409 means the server lost the conversation: resend the turn
+    with ``chat_history``.
     """
     try:
         response = await chat_service.process_message(
             youtube_url=chat_request.youtube_url,
             user_message=chat_request.message,
-            chat_history=chat_request.chat_history
+            chat_history=chat_request.chat_history,
+            conversation_id=chat_request.conversation_id,
+            last_seen_seq=chat_request.last_seen_seq
         )
         return response
+    except ConversationResyncRequired as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/chat/stream")
+async def stream_chat_with_youtuber(
+    chat_request: ChatRequest,
+    chat_service: ChatService = Depends(get_chat_service)
+):
+    """
+    Chat with an AI that mimics a YouTuber's style, streaming the reply as
+    server-sent events: ``start``, then ``token`` per chunk, then ``done``
+    (or ``error``). History is sent as for /chat.
+    """
+    try:
+        conversation_id, conversation = chat_service.open_conversation(
+            chat_request.youtube_url,
+            chat_request.conversation_id,
+            chat_request.last_seen_seq,
+            chat_request.chat_history,
+            chat_request.message
+        )
+    except ConversationResyncRequired as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    # A rebuilt conversation starts from the client's own history
+    last_seen_seq = chat_request.last_seen_seq if conversation_id == chat_request.conversation_id else None
+    
+    async def event_stream():
+        async for event in chat_service.stream_turn(
+            conversation_id, conversation, chat_request.message, last_seen_seq
+        ):
+            name = event.pop('event')
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@router.websocket("/ws/chat")
+async def chat_socket(
+    websocket: WebSocket,
+    youtube_url: str,
+    conversation_id: Optional[str] = None,
+    last_seen_seq: Optional[int] = Query(None, ge=0),
+    chat_service: ChatService = Depends(get_chat_service),
+    sockets: SocketRegistry = Depends(get_socket_registry)
+):
+    """
+    Chat over a WebSocket bound to one channel and conversation.
+
+    The channel and conversation are resolved once from the query string and
+    announced in a ``ready`` event with the conversation's ``seq`` and any
+    messages after ``last_seen_seq``. If the server no longer has the
+    conversation the socket is closed with 4409; rebuild it through /chat
+    with ``chat_history`` and reconnect. After that the client sends only new
+    turns, ``{"type": "message", "message": "..."}``, and receives the same
+    ``start`` / ``token`` / ``done`` / ``error`` events as /chat/stream.
+    Idle sockets get ``ping`` events, which the client may answer with
+    ``{"type": "pong"}``; any message counts as a sign of life.
+    """
+    await websocket.accept()
+    # Accept first so the client sees why it was turned away
+    if not sockets.acquire():
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        return
+    try:
+        try:
+            bound_id, conversation = chat_service.open_conversation(
+                youtube_url, conversation_id, last_seen_seq
+            )
+        except ConversationResyncRequired as e:
+            await websocket.close(code=CLOSE_RESYNC_REQUIRED, reason=str(e))
+            return
+        missed = []
+        if bound_id == conversation_id and last_seen_seq is not None:
+            missed = conversation['messages'][last_seen_seq:]
+        conversation_id = bound_id
+        # Load the channel while the user types their first message
+        chat_service.schedule_warmup(youtube_url)
+        await websocket.send_json({
+            'event': 'ready',
+            'conversation_id': conversation_id,
+            'seq': len(conversation['messages']),
+            'missed_messages': missed
+        })
+        channel_info_sent = False
+        while True:
+            try:
+                message = await sockets.receive(websocket)
+            except ValueError:
+                await websocket.close(code=CLOSE_POLICY_VIOLATION)
+                return
+            if message is None:
+                return
+            if message.get('type') != 'message' or not isinstance(message.get('message'), str):
+                await websocket.send_json({'event': 'error', 'error': "Expected {\"type\": \"message\", \"message\": ...}"})
+                continue
+            async with aclosing(
+                chat_service.stream_turn(conversation_id, conversation, message['message'])
+            ) as events:
+                async for event in events:
+                    # The socket is bound to the conversation, and the channel
+                    # info only needs to reach the client once
+                    event.pop('conversation_id', None)
+                    if event['event'] == 'start':
+                        if channel_info_sent:
+                            event.pop('channel_info')
+                        channel_info_sent = True
+                    await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sockets.release()
+
 @router.get("/conversations/{conversation_id}")
 async def get_conversation(
     conversation_id: str,
+    since: int = Query(0, ge=0),
     chat_service: ChatService = Depends(get_chat_service)
 ):
     """
-    Get conversation history by ID
+    Get conversation history by ID, from message ``since`` onwards
     """
     if conversation_id in chat_service.conversations:
+        messages = chat_service.conversations[conversation_id]['messages']
         return {
             'conversation_id': conversation_id,
-            'messages': chat_service.conversations[conversation_id]['messages']
+            'seq': len(messages),
+            'messages': messages[since:]
         }
     raise HTTPException(status_code=404, detail="Conversation not found")
\ No newline at end of file
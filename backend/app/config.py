@@ -27,10 +27,109 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./youtuber_chatbot.db")
     
+    # LLM backend: 'openai', or 'stub' for a local stand-in that simulates
+    # completions (no API key or network needed; for load tests and benchmarks)
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "openai")
+    # Stub: median time to first token, its distribution (fixed, uniform,
+    # normal, lognormal) and width relative to the median, generation speed,
+    # reply length, fraction of failed requests, and the random seed
+    STUB_LATENCY_MS: float = float(os.getenv("STUB_LATENCY_MS", "400"))
+    STUB_LATENCY_DISTRIBUTION: str = os.getenv("STUB_LATENCY_DISTRIBUTION", "lognormal")
+    STUB_LATENCY_SPREAD: float = float(os.getenv("STUB_LATENCY_SPREAD", "0.5"))
+    STUB_TOKENS_PER_SECOND: float = float(os.getenv("STUB_TOKENS_PER_SECOND", "50"))
+    STUB_REPLY_TOKENS: int = int(os.getenv("STUB_REPLY_TOKENS", "80"))
+    STUB_ERROR_RATE: float = float(os.getenv("STUB_ERROR_RATE", "0"))
+    STUB_SEED: int = int(os.getenv("STUB_SEED", "0"))
+    
     # OpenAI Settings
     OPENAI_MODEL: str = "gpt-3.5-turbo"
     OPENAI_TEMPERATURE: float = 0.7
     OPENAI_MAX_TOKENS: int = 1000
+    # Model context window (0 = look it up from the model name), and an
+    # optional cap on prompt tokens below what the window leaves after
+    # OPENAI_MAX_TOKENS (0 = no cap)
+    OPENAI_CONTEXT_WINDOW: int = int(os.getenv("OPENAI_CONTEXT_WINDOW", "0"))
+    PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))
+    # tiktoken BPE files, shipped with the app (populate with
+    # `python -m app.services.tokenizer`) so encoders load without network
+    TIKTOKEN_CACHE_DIR: str = os.getenv("TIKTOKEN_CACHE_DIR", str(BACKEND_DIR / "tiktoken_cache"))
+    
+    # Chat Settings
+    MAX_CONVERSATIONS: int = int(os.getenv("MAX_CONVERSATIONS", "1000"))
+    # Overall budget for one chat turn, and the part of it kept back for the AI response
+    CHAT_DEADLINE_SECONDS: float = float(os.getenv("CHAT_DEADLINE_SECONDS", "30"))
+    CHAT_LLM_RESERVE_SECONDS: float = float(os.getenv("CHAT_LLM_RESERVE_SECONDS", "10"))
+    # How long a reply waits for transcripts before answering from basic context
+    TRANSCRIPT_BUDGET_SECONDS: float = float(os.getenv("TRANSCRIPT_BUDGET_SECONDS", "3"))
+    
+    # Chat WebSockets: sockets open at once, seconds between heartbeats on an
+    # idle socket, and how long a silent client is kept before it is closed
+    WS_MAX_CONNECTIONS: int = int(os.getenv("WS_MAX_CONNECTIONS", "500"))
+    WS_HEARTBEAT_SECONDS: float = float(os.getenv("WS_HEARTBEAT_SECONDS", "20"))
+    WS_IDLE_TIMEOUT_SECONDS: float = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "300"))
+    
+    # Background work (speculative channel warm-ups): jobs running at once,
+    # and jobs accepted before new ones are turned away
+    BACKGROUND_MAX_CONCURRENCY: int = int(os.getenv("BACKGROUND_MAX_CONCURRENCY", "4"))
+    BACKGROUND_MAX_PENDING: int = int(os.getenv("BACKGROUND_MAX_PENDING", "100"))
+    
+    # Channels (IDs, handles or URLs, comma-separated) warmed at startup so a
+    # deploy does not send their first chats down the cold path
+    PREWARM_CHANNELS: str = os.getenv("PREWARM_CHANNELS", "")
+    PREWARM_CONCURRENCY: int = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+    
+    # Channel cache: entries are fresh for the TTL, then served stale while
+    # being refreshed for up to CHANNEL_CACHE_STALE_SECONDS more
+    CHANNEL_CACHE_MAX_ENTRIES: int = int(os.getenv("CHANNEL_CACHE_MAX_ENTRIES", "500"))
+    CHANNEL_CACHE_MAX_BYTES: int = int(os.getenv("CHANNEL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    CHANNEL_CACHE_TTL_SECONDS: float = float(os.getenv("CHANNEL_CACHE_TTL_SECONDS", "3600"))
+    CHANNEL_CACHE_STALE_SECONDS: float = float(os.getenv("CHANNEL_CACHE_STALE_SECONDS", "86400"))
+    
+    # YouTube Data API quota: low-priority calls (background refresh, prewarm)
+    # stop once less than QUOTA_LOW_PRIORITY_FLOOR of the budget is left, normal
+    # calls at QUOTA_NORMAL_PRIORITY_FLOOR
+    YOUTUBE_DAILY_QUOTA: int = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+    QUOTA_LOW_PRIORITY_FLOOR: float = float(os.getenv("QUOTA_LOW_PRIORITY_FLOOR", "0.5"))
+    QUOTA_NORMAL_PRIORITY_FLOOR: float = float(os.getenv("QUOTA_NORMAL_PRIORITY_FLOOR", "0.1"))
+    
+    # videos.list enrichment runs in batches of 50 IDs
+    ENRICH_MAX_CONCURRENT_BATCHES: int = int(os.getenv("ENRICH_MAX_CONCURRENT_BATCHES", "4"))
+    
+    # ETag-validated Data API responses, revalidated with If-None-Match
+    ETAG_CACHE_MAX_ENTRIES: int = int(os.getenv("ETAG_CACHE_MAX_ENTRIES", "2000"))
+    ETAG_CACHE_MAX_BYTES: int = int(os.getenv("ETAG_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    ETAG_CACHE_TTL_SECONDS: float = float(os.getenv("ETAG_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    
+    # Handle -> channel ID resolutions (persisted under DATA_DIR)
+    HANDLE_MAP_TTL_SECONDS: float = float(os.getenv("HANDLE_MAP_TTL_SECONDS", str(30 * 24 * 3600)))
+    HANDLE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("HANDLE_NEGATIVE_TTL_SECONDS", "3600"))
+    
+    # Transcript scraping (runs in a dedicated thread pool)
+    TRANSCRIPT_WORKERS: int = int(os.getenv("TRANSCRIPT_WORKERS", "4"))
+    TRANSCRIPT_MAX_CONCURRENCY: int = int(os.getenv("TRANSCRIPT_MAX_CONCURRENCY", "4"))
+    TRANSCRIPT_TIMEOUT_SECONDS: float = float(os.getenv("TRANSCRIPT_TIMEOUT_SECONDS", "15"))
+    
+    # Channel search (scraper runs in its own thread pool, results are cached)
+    SEARCH_WORKERS: int = int(os.getenv("SEARCH_WORKERS", "2"))
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+    SEARCH_CACHE_MAX_BYTES: int = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    SEARCH_CACHE_TTL_SECONDS: float = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "600"))
+    
+    # Local data (transcript store and other persistent caches)
+    DATA_DIR: str = os.getenv("DATA_DIR", str(BACKEND_DIR / "data"))
+    TRANSCRIPT_STORE_ENABLED: bool = os.getenv("TRANSCRIPT_STORE_ENABLED", "True").lower() in ("true", "1", "t")
+    # Train the compression dictionary once this many transcripts are stored
+    TRANSCRIPT_STORE_TRAIN_AFTER: int = int(os.getenv("TRANSCRIPT_STORE_TRAIN_AFTER", "200"))
+    
+    # Outbound HTTP pool (shared by all YouTube Data API calls)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+    HTTP_HTTP2: bool = os.getenv("HTTP_HTTP2", "True").lower() in ("true", "1", "t")
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+    HTTP_WRITE_TIMEOUT: float = float(os.getenv("HTTP_WRITE_TIMEOUT", "5"))
+    HTTP_POOL_TIMEOUT: float = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
     
     class Config:
         case_sensitive = True
@@ -0,0 +1,122 @@
+"""
+Process-wide service container.
+
+Services are built once in the FastAPI lifespan and handed to request handlers
+through ``Depends`` so their caches (channels, conversations, connection pool)
+survive across requests.
+"""
+import asyncio
+import os
+import time
+from typing import Dict
+from .config import settings
+from .services.http_client import PooledHTTPClient
+from .services.transcript_store import TranscriptStore
+from .services.quota import QuotaLedger
+from .services.handle_map import HandleMap
+from .services.background import BackgroundTaskPool
+from .services.prewarm import ChannelPrewarmer
+from .services.sockets import SocketRegistry
+from .services.youtube_service import YouTubeService
+from .services.ai_service import AIService
+from .services.tokenizer import TokenCounter
+from .services.chat_service import ChatService
+
+
+class ServiceContainer:
+    def __init__(self):
+        build_start = time.perf_counter()
+        self.http_client = PooledHTTPClient()
+        self.transcript_store = None
+        if settings.TRANSCRIPT_STORE_ENABLED:
+            self.transcript_store = TranscriptStore(
+                os.path.join(settings.DATA_DIR, "transcripts"),
+                train_after=settings.TRANSCRIPT_STORE_TRAIN_AFTER
+            )
+        self.quota = QuotaLedger(
+            settings.YOUTUBE_DAILY_QUOTA,
+            low_priority_floor=settings.QUOTA_LOW_PRIORITY_FLOOR,
+            normal_priority_floor=settings.QUOTA_NORMAL_PRIORITY_FLOOR,
+            state_path=os.path.join(settings.DATA_DIR, "quota.json")
+        )
+        self.handle_map = HandleMap(
+            os.path.join(settings.DATA_DIR, "handles.json"),
+            ttl=settings.HANDLE_MAP_TTL_SECONDS,
+            negative_ttl=settings.HANDLE_NEGATIVE_TTL_SECONDS
+        )
+        self.youtube_service = YouTubeService(
+            api_key=settings.YOUTUBE_API_KEY,
+            http_client=self.http_client,
+            transcript_store=self.transcript_store,
+            quota=self.quota,
+            handle_map=self.handle_map
+        )
+        self.token_counter = TokenCounter(settings.TIKTOKEN_CACHE_DIR)
+        self.ai_service = AIService(api_key=settings.OPENAI_API_KEY, token_counter=self.token_counter)
+        self.background = BackgroundTaskPool(
+            max_concurrency=settings.BACKGROUND_MAX_CONCURRENCY,
+            max_pending=settings.BACKGROUND_MAX_PENDING
+        )
+        self.chat_service = ChatService(self.youtube_service, self.ai_service, background=self.background)
+        self.prewarmer = ChannelPrewarmer(
+            self.chat_service,
+            [channel.strip() for channel in settings.PREWARM_CHANNELS.split(",") if channel.strip()],
+            concurrency=settings.PREWARM_CONCURRENCY
+        )
+        self.sockets = SocketRegistry(
+            settings.WS_MAX_CONNECTIONS,
+            heartbeat_seconds=settings.WS_HEARTBEAT_SECONDS,
+            idle_timeout_seconds=settings.WS_IDLE_TIMEOUT_SECONDS
+        )
+        self.build_ms = (time.perf_counter() - build_start) * 1000
+        self.started_at = time.time()
+
+        self._encoder_load = None
+        
+        # Per-request dependency resolution cost
+        self.resolutions = 0
+        self.resolution_ms = 0.0
+
+    async def start(self) -> None:
+        """Open long-lived resources and kick off the channel prewarm."""
+        await self.http_client.start()
+        # Encoders load from disk in a worker thread; counts are estimated until then
+        self._encoder_load = asyncio.get_running_loop().run_in_executor(
+            None, self.token_counter.preload, [self.ai_service.model]
+        )
+        self.prewarmer.start(ready=self._encoder_load)
+
+    async def close(self) -> None:
+        """Release long-lived resources."""
+        await self.prewarmer.close()
+        await self.background.close()
+        self.youtube_service.close()
+        await self.handle_map.flush()
+        await self.quota.flush()
+        self.quota.save()
+        await self.http_client.close()
+
+    def record_resolution(self, elapsed_ms: float) -> None:
+        """Record the time spent handing a service to a request."""
+        self.resolutions += 1
+        self.resolution_ms += elapsed_ms
+
+    def metrics(self) -> Dict:
+        """Aggregate runtime counters from every service."""
+        return {
+            'container': {
+                'build_ms': round(self.build_ms, 3),
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'resolutions': self.resolutions,
+                'avg_resolution_ms': round(self.resolution_ms / self.resolutions, 4) if self.resolutions else 0.0,
+            },
+            'http_pool': self.http_client.stats(),
+            'youtube': self.youtube_service.stats(),
+            'quota': self.quota.stats(),
+            'chat': self.chat_service.stats(),
+            'background': self.background.stats(),
+            'tokens': self.token_counter.stats(),
+            'llm': self.ai_service.backend.stats(),
+            'prewarm': self.prewarmer.progress(),
+            'websockets': self.sockets.stats(),
+        }
@@ -1,18 +1,31 @@
-from typing import Generator
+import time
 from fastapi import Depends
+from starlette.requests import HTTPConnection
+from .container import ServiceContainer
 from .services.youtube_service import YouTubeService
 from .services.ai_service import AIService
 from .services.chat_service import ChatService
-from .config import settings
+from .services.sockets import SocketRegistry
 
-def get_youtube_service() -> YouTubeService:
-    return YouTubeService(api_key=settings.YOUTUBE_API_KEY)
+def get_container(connection: HTTPConnection) -> ServiceContainer:
+    # HTTPConnection rather than Request so WebSocket routes can depend on it too
+    return connection.app.state.container
 
-def get_ai_service() -> AIService:
-    return AIService(api_key=settings.OPENAI_API_KEY)
+def _resolve(container: ServiceContainer, name: str):
+    """Hand out a shared service, recording the per-request resolution cost."""
+    start_time = time.perf_counter()
+    service = getattr(container, name)
+    container.record_resolution((time.perf_counter() - start_time) * 1000)
+    return service
 
-def get_chat_service(
-    youtube_service: YouTubeService = Depends(get_youtube_service),
-    ai_service: AIService = Depends(get_ai_service)
-) -> ChatService:
-    return ChatService(youtube_service=youtube_service, ai_service=ai_service)
+def get_youtube_service(container: ServiceContainer = Depends(get_container)) -> YouTubeService:
+    return _resolve(container, 'youtube_service')
+
+def get_ai_service(container: ServiceContainer = Depends(get_container)) -> AIService:
+    return _resolve(container, 'ai_service')
+
+def get_chat_service(container: ServiceContainer = Depends(get_container)) -> ChatService:
+    return _resolve(container, 'chat_service')
+
+def get_socket_registry(container: ServiceContainer = Depends(get_container)) -> SocketRegistry:
+    return _resolve(container, 'sockets')
@@ -7,15 +7,29 @@ from pydantic import BaseModel
 from typing import List, Dict, Any
 import logging
 import time
+from contextlib import asynccontextmanager
 
 from app.services.youtube_service import YouTubeService
 from app.services.ai_service import AIService
-from app.services.chat_service import ChatService
 from app.config import settings
+from app.container import ServiceContainer
+from app.dependencies import get_container, get_youtube_service, get_ai_service
 from app.api.endpoints import router as api_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the service container on startup and release it on shutdown."""
+    container = ServiceContainer()
+    await container.start()
+    app.state.container = container
+    try:
+        yield
+    finally:
+        await container.close()
+
 # Create FastAPI app with OpenAPI configuration
 app = FastAPI(
+    lifespan=lifespan,
     title="YouTuber Chatbot API",
     description="API for chatting with AI that mimics YouTubers",
     version="1.0.0",
@@ -37,11 +51,6 @@ app.add_middleware(
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize services
-youtube_service = YouTubeService(api_key=settings.YOUTUBE_API_KEY)
-ai_service = AIService(api_key=settings.OPENAI_API_KEY)
-chat_service = ChatService(youtube_service, ai_service)
-
 # Include API router
 app.include_router(api_router, prefix="/api")
 
@@ -86,17 +95,26 @@ async def root():
     }
 
 @app.get("/api/health")
-async def health_check():
-    """Health check endpoint"""
+async def health_check(container: ServiceContainer = Depends(get_container)):
+    """Health check endpoint
+    
+    Ready as soon as the app is up; startup prewarm progress is reported
+    alongside but never holds readiness back.
+    """
     return {
         "status": "ok",
         "version": "1.0.0",
-        "environment": "development" if settings.DEBUG else "production"
+        "environment": "development" if settings.DEBUG else "production",
+        "prewarm": container.prewarmer.progress()
     }
 
+@app.get("/api/metrics")
+async def metrics(container: ServiceContainer = Depends(get_container)):
+    """Runtime counters for connection pools and caches"""
+    return container.metrics()
 
 @app.get("/api/youtube/channel")
-async def get_channel_info(url: str):
+async def get_channel_info(url: str, youtube_service: YouTubeService = Depends(get_youtube_service)):
     """Get information about a YouTube channel"""
     try:
         channel_info = await youtube_service.get_channel_info(url)
@@ -121,7 +139,7 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 @app.get("/api/test-ai")
-async def test_ai(message: str = "Hello, how are you?"):
+async def test_ai(message: str = "Hello, how are you?", ai_service: AIService = Depends(get_ai_service)):
     try:
         response = await ai_service.generate_response(message)
         return {"response": response}
@@ -1,95 +1,261 @@
+import logging
 import os
-from typing import List, Dict, Optional
-import openai
-import tiktoken
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from ..config import settings
+from .llm_backend import LLMBackend, create_backend
+from .tokenizer import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# Context window (prompt + completion tokens) by model name prefix; the
+# longest matching prefix wins
+MODEL_CONTEXT_WINDOWS = {
+    'gpt-3.5-turbo': 16385,
+    'gpt-4': 8192,
+    'gpt-4-32k': 32768,
+    'gpt-4-turbo': 128000,
+    'gpt-4o': 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# Chat format overhead: every message is wrapped in a few tokens, and the
+# reply is primed with a few more
+TOKENS_PER_MESSAGE = 4
+REPLY_PRIMING_TOKENS = 3
+
+EXCERPTS_HEADER = "Sample of the YouTuber's speech patterns:"
+
+
+def context_window_for(model: str) -> int:
+    """Return the context window of a model, or a conservative default"""
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
 
 class AIService:
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        token_counter: Optional[TokenCounter] = None,
+        backend: Optional[LLMBackend] = None
+    ):
         self.api_key = api_key or settings.OPENAI_API_KEY
         self.model = settings.OPENAI_MODEL
+        self.token_counter = token_counter or TokenCounter(settings.TIKTOKEN_CACHE_DIR)
         self.max_tokens = settings.OPENAI_MAX_TOKENS
         self.temperature = settings.OPENAI_TEMPERATURE
         
-        if not self.api_key:
-            raise ValueError("OpenAI API key is not configured")
-            
-        openai.api_key = self.api_key
+        # Prompt tokens available once the completion is reserved, optionally
+        # capped lower to bound cost
+        self.context_window = settings.OPENAI_CONTEXT_WINDOW or context_window_for(self.model)
+        self.prompt_budget = self.context_window - self.max_tokens
+        if settings.PROMPT_TOKEN_BUDGET:
+            self.prompt_budget = min(self.prompt_budget, settings.PROMPT_TOKEN_BUDGET)
+        
+        # Raises if the OpenAI backend is selected without an API key
+        self.backend = backend or create_backend(settings.LLM_BACKEND, self.api_key, self.model)
     
     async def generate_response(
         self,
         prompt: str,
         context: str = "",
         conversation_history: List[Dict] = None,
-        youtuber_style: str = ""
+        youtuber_style: str = "",
+        system_message: Optional[str] = None
     ) -> str:
         """
-        Generate a response using OpenAI's API
+        Generate a response using the LLM backend
         
         Args:
             prompt: The user's message
             context: Additional context about the YouTuber
             conversation_history: List of previous messages in the conversation
             youtuber_style: Description of the YouTuber's speaking style
+            system_message: A prebuilt system prompt (see build_system_message);
+                replaces ``context`` and ``youtuber_style`` when given
             
         Returns:
             Generated response text
         """
-        try:
-            # Prepare messages with system and user context
-            messages = []
-            
-            # Add system message with instructions
-            system_message = (
-                "You are an AI that mimics the style and personality of a specific YouTuber. "
-                "Respond to the user's questions in a way that matches the YouTuber's tone, "
-                "vocabulary, and speaking patterns. Be engaging and natural in your responses.\n\n"
-            )
+        if system_message is None:
+            system_message = self.build_system_message(youtuber_style, context)
+        messages, _ = self.assemble_prompt(system_message, prompt, conversation_history)
+        return await self.complete(messages)
+    
+    def assemble_prompt(
+        self,
+        system_message: str,
+        prompt: str,
+        conversation_history: List[Dict] = None,
+        excerpts: List[Dict] = None,
+        system_tokens: Optional[int] = None
+    ) -> Tuple[List[Dict], Dict]:
+        """
+        Fit a prompt into the token budget
+        
+        The persona (system message) and the user's message always go in.
+        The remaining budget goes to the most recent conversation turns, then
+        to transcript excerpts, each taken in order until the next one no
+        longer fits.
+        
+        Args:
+            system_message: The persona system prompt
+            prompt: The user's message
+            conversation_history: Previous messages, oldest first
+            excerpts: Transcript excerpts (``title``, ``text`` and optionally
+                ``tokens`` from format_excerpt), most relevant first
+            system_tokens: Token count of ``system_message`` if already known
             
-            if youtuber_style:
-                system_message += f"YouTuber's style and background: {youtuber_style}\n\n"
-                
-            if context:
-                system_message += f"Additional context about the YouTuber: {context}\n\n"
-                
-            system_message += (
-                "Remember to keep your responses concise and in the first person perspective. "
-                "If you don't know the answer to something, it's okay to say so in a way that "
-                "matches the YouTuber's style."
-            )
+        Returns:
+            The chat messages, and the tokens used by each section
+        """
+        conversation_history = conversation_history or []
+        excerpts = excerpts or []
+        if system_tokens is None:
+            system_tokens = self.count_tokens(system_message)
+        user_tokens = self.count_tokens(prompt) + TOKENS_PER_MESSAGE
+        overhead = REPLY_PRIMING_TOKENS + TOKENS_PER_MESSAGE
+        used = overhead + system_tokens + user_tokens
+        
+        # Most recent turns first, so the oldest are the ones dropped
+        history_counts = self.count_tokens_many([msg["content"] for msg in conversation_history])
+        history = []
+        history_tokens = 0
+        for msg, (tokens, _) in zip(reversed(conversation_history), reversed(history_counts)):
+            cost = tokens + TOKENS_PER_MESSAGE
+            if used + cost > self.prompt_budget:
+                break
+            history.append({"role": msg["role"], "content": msg["content"]})
+            used += cost
+            history_tokens += cost
+        history.reverse()
+        
+        excerpt_lines = []
+        excerpt_tokens = 0
+        for excerpt in excerpts:
+            tokens = excerpt.get("tokens")
+            if tokens is None:
+                tokens = self.count_tokens(self.format_excerpt(excerpt))
+            # Each excerpt sits on its own line; the first also adds the header
+            cost = tokens + 1
+            if not excerpt_lines:
+                cost += self.count_tokens(EXCERPTS_HEADER) + 2
+            if used + cost > self.prompt_budget:
+                break
+            excerpt_lines.append(self.format_excerpt(excerpt))
+            used += cost
+            excerpt_tokens += cost
+        if excerpt_lines:
+            system_message = "\n\n".join([system_message, "\n".join([EXCERPTS_HEADER] + excerpt_lines)])
+        
+        messages = [{"role": "system", "content": system_message}] + history
+        messages.append({"role": "user", "content": prompt})
+        
+        usage = {
+            'budget': self.prompt_budget,
+            'persona': system_tokens,
+            'history': history_tokens,
+            'history_messages': len(history),
+            'history_dropped': len(conversation_history) - len(history),
+            'excerpts': excerpt_tokens,
+            'excerpt_count': len(excerpt_lines),
+            'user': user_tokens,
+            'overhead': overhead,
+            'total': used,
+            # Heuristic counts until the model's encoder has loaded
+            'estimated': not self.token_counter.is_loaded(self.model),
+        }
+        return messages, usage
+    
+    @staticmethod
+    def format_excerpt(excerpt: Dict) -> str:
+        """Render a transcript excerpt the way it appears in the prompt"""
+        return f"From '{excerpt['title']}': {excerpt['text']}"
+    
+    async def complete(self, messages: List[Dict]) -> str:
+        """
+        Send assembled chat messages to the LLM backend
+        
+        Args:
+            messages: Chat messages as returned by assemble_prompt
             
-            messages.append({"role": "system", "content": system_message})
+        Returns:
+            Generated response text
+        """
+        try:
+            return await self.backend.complete(messages, self.temperature, self.max_tokens)
             
-            # Add conversation history if provided
-            if conversation_history:
-                for msg in conversation_history[-6:]:  # Limit history to last 6 messages
-                    messages.append({"role": msg["role"], "content": msg["content"]})
+        except Exception as e:
+            logger.error(f"Error generating AI response: {str(e)}")
+            return "I'm having trouble generating a response right now. Please try again later."
+    
+    async def stream(self, messages: List[Dict]) -> AsyncIterator[str]:
+        """
+        Stream a response from the LLM backend as it is generated
+        
+        Args:
+            messages: Chat messages as returned by assemble_prompt
             
-            # Add the current user message
-            messages.append({"role": "user", "content": prompt})
+        Yields:
+            Chunks of response text
+        """
+        produced = False
+        try:
+            async for content in self.backend.stream(messages, self.temperature, self.max_tokens):
+                produced = True
+                yield content
+                    
+        except Exception as e:
+            logger.error(f"Error streaming AI response: {str(e)}")
+            # A reply that already started is left as it is
+            if not produced:
+                yield "I'm having trouble generating a response right now. Please try again later."
+    
+    def build_system_message(self, youtuber_style: str = "", context: str = "") -> str:
+        """
+        Build the system prompt that sets up the YouTuber persona
+        
+        Args:
+            youtuber_style: Description of the YouTuber's speaking style
+            context: Additional context about the YouTuber
             
-            # Call the OpenAI API
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
+        Returns:
+            System message text
+        """
+        # Add system message with instructions
+        system_message = (
+            "You are an AI that mimics the style and personality of a specific YouTuber. "
+            "Respond to the user's questions in a way that matches the YouTuber's tone, "
+            "vocabulary, and speaking patterns. Be engaging and natural in your responses.\n\n"
+        )
+        
+        if youtuber_style:
+            system_message += f"YouTuber's style and background: {youtuber_style}\n\n"
             
-            return response.choices[0].message['content'].strip()
+        if context:
+            system_message += f"Additional context about the YouTuber: {context}\n\n"
             
-        except Exception as e:
-            print(f"Error generating AI response: {str(e)}")
-            return "I'm having trouble generating a response right now. Please try again later."
+        system_message += (
+            "Remember to keep your responses concise and in the first person perspective. "
+            "If you don't know the answer to something, it's okay to say so in a way that "
+            "matches the YouTuber's style."
+        )
+        return system_message
     
     def count_tokens(self, text: str) -> int:
         """Count the number of tokens in a text string"""
-        try:
-            encoding = tiktoken.encoding_for_model(self.model)
-            return len(encoding.encode(text))
-        except:
-            # Fallback for unknown models
-            return len(text) // 4  # Rough estimate
-
-# Create a singleton instance
-ai_service = AIService()
+        return self.token_counter.count(text, self.model)[0]
+    
+    def count_tokens_many(self, texts: List[str]) -> List[Tuple[int, bool]]:
+        """
+        Count tokens for several texts in one batch
+        
+        Args:
+            texts: Texts to count
+            
+        Returns:
+            ``(tokens, estimated)`` per text; ``estimated`` is True when the
+            model's encoder is not loaded and the count is a rough estimate
+        """
+        return self.token_counter.count_many(texts, self.model)
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of BackgroundTaskPool.submit
+SCHEDULED = 'scheduled'
+ALREADY_SCHEDULED = 'already_scheduled'
+REJECTED = 'rejected'
+
+
+class BackgroundTaskPool:
+    """Bounded, de-duplicated pool for fire-and-forget work.
+
+    At most ``max_concurrency`` jobs run at once and at most ``max_pending``
+    are accepted (running plus queued); further submissions are rejected
+    rather than queued without limit. A job whose key is already pending is
+    not scheduled twice.
+    """
+
+    def __init__(self, max_concurrency: int, max_pending: int):
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.scheduled = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, key: Hashable, fn: Callable[[], Awaitable]) -> str:
+        """Schedule ``fn()`` under ``key``; returns one of the outcome constants."""
+        if key in self._tasks:
+            self.deduplicated += 1
+            return ALREADY_SCHEDULED
+        if len(self._tasks) >= self.max_pending:
+            self.rejected += 1
+            return REJECTED
+        self.scheduled += 1
+        task = asyncio.ensure_future(self._run(key, fn))
+        self._tasks[key] = task
+        return SCHEDULED
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable]) -> None:
+        try:
+            async with self._semaphore:
+                await fn()
+            self.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Background job {key!r} failed: {str(e)}")
+        finally:
+            self._tasks.pop(key, None)
+
+    def is_pending(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    async def close(self) -> None:
+        """Cancel outstanding jobs."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            'pending': len(self._tasks),
+            'max_pending': self.max_pending,
+            'scheduled': self.scheduled,
+            'deduplicated': self.deduplicated,
+            'rejected': self.rejected,
+            'completed': self.completed,
+            'failed': self.failed,
+        }
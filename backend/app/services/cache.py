@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory held by a JSON-like value, in bytes."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class _CacheEntry:
+    __slots__ = ('value', 'size', 'stored_at', 'expires_at')
+
+    def __init__(self, value: Any, size: int, ttl: float):
+        self.value = value
+        self.size = size
+        self.stored_at = time.monotonic()
+        self.expires_at = self.stored_at + ttl
+
+
+class TTLCache:
+    """LRU cache bounded by entry count and an approximate byte budget.
+
+    Entries are fresh for ``ttl`` seconds. For ``stale_ttl`` seconds after that
+    they are still served, but the caller is expected to revalidate them with
+    :meth:`refresh` (stale-while-revalidate). Older entries count as misses.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        stale_ttl: float = 0,
+        sizer: Callable[[Any], int] = estimate_size
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.sizer = sizer
+        self._entries: 'OrderedDict[Hashable, _CacheEntry]' = OrderedDict()
+        self._refreshing: Set[Hashable] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self.current_bytes = 0
+
+        # Counters
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejections = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._live_entry(key) is not None
+
+    def _live_entry(self, key: Hashable) -> Optional[_CacheEntry]:
+        """Return the entry if it is fresh or within its stale window."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() > entry.expires_at + self.stale_ttl:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh or stale value, or ``default`` on a miss."""
+        entry = self._live_entry(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if self._is_stale(entry):
+            self.stale_hits += 1
+        return entry.value
+
+    def is_stale(self, key: Hashable) -> bool:
+        """Whether a cached value has outlived its TTL and should be revalidated."""
+        entry = self._entries.get(key)
+        return entry is not None and self._is_stale(entry)
+
+    def _is_stale(self, entry: _CacheEntry) -> bool:
+        return time.monotonic() > entry.expires_at
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        """Store a value, evicting least recently used entries to stay in budget.
+
+        Returns False if the value alone is larger than the byte budget.
+        """
+        size = self.sizer(value)
+        if size > self.max_bytes:
+            self.rejections += 1
+            return False
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _CacheEntry(value, size, self.ttl)
+        self.current_bytes += size
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return entry.value
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+
+    def refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> bool:
+        """Reload ``key`` in the background, keeping the stale value until it lands.
+
+        Returns False if a refresh for this key is already running.
+        """
+        if key in self._refreshing:
+            return False
+        self._refreshing.add(key)
+        task = asyncio.ensure_future(self._run_refresh(key, loader))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+        return True
+
+    async def _run_refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            value = await loader()
+            self.set(key, value)
+            self.refreshes += 1
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.warning(f"Background refresh failed for {key!r}: {str(e)}")
+        finally:
+            self._refreshing.discard(key)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'rejections': self.rejections,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'refreshing': len(self._refreshing),
+        }
@@ -1,18 +1,82 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, AsyncIterator
+from collections import OrderedDict
+from contextlib import aclosing
 import asyncio
+import logging
+import re
+import uuid
+from ..config import settings
+from .cache import TTLCache
+from .singleflight import SingleFlight
+from .quota import PRIORITY_LOW, PRIORITY_NORMAL, QuotaExceededError
+from .pipeline import Deadline, StageTimer
+from .background import BackgroundTaskPool, REJECTED
+from .youtube_service import is_channel_id
+
+logger = logging.getLogger(__name__)
+
+# How much of the YouTuber's content backed a reply: 'basic' is channel
+# metadata and video titles, 'full' adds transcript excerpts
+CONTEXT_TIER_BASIC = 'basic'
+CONTEXT_TIER_FULL = 'full'
+
+# Transcripts are cut into excerpts of about this many words for the prompt
+EXCERPT_WORDS = 120
+
+# Returned by schedule_warmup when there is nothing left to prefetch
+WARMUP_ALREADY_WARM = 'warm'
+
+class ConversationResyncRequired(Exception):
+    """The client's conversation is gone or ahead of the server's copy, and
+    it sent no history to rebuild it from"""
 
 class ChatService:
-    def __init__(self, youtube_service, ai_service):
+    def __init__(self, youtube_service, ai_service, background: Optional[BackgroundTaskPool] = None):
         self.youtube_service = youtube_service
         self.ai_service = ai_service
-        self.channel_cache = {}
-        self.conversations = {}
+        # Speculative warm-ups run here so they cannot pile up unbounded
+        self.background = background
+        self.channel_cache = TTLCache(
+            max_entries=settings.CHANNEL_CACHE_MAX_ENTRIES,
+            max_bytes=settings.CHANNEL_CACHE_MAX_BYTES,
+            ttl=settings.CHANNEL_CACHE_TTL_SECONDS,
+            stale_ttl=settings.CHANNEL_CACHE_STALE_SECONDS
+        )
+        self.conversations = OrderedDict()
+        self.max_conversations = settings.MAX_CONVERSATIONS
+        # Conversations rebuilt from a client-sent history
+        self.history_resyncs = 0
+        # Concurrent warm-ups of the same channel share one fetch
+        self.channel_warmups = SingleFlight()
+        
+        # Stale-entry refreshes: incremental ones only fetch uploads newer than
+        # the entry's newest video
+        self.refreshes = {'incremental': 0, 'full': 0, 'new_videos': 0}
+        
+        # Background transcript fetches per channel, and replies sent without them
+        self._sample_tasks: Dict[str, asyncio.Task] = {}
+        self.degraded_replies = 0
+        
+        # Prompt tokens spent per section, summed over replies
+        self.prompt_replies = 0
+        self.prompt_token_totals = {'persona': 0, 'history': 0, 'excerpts': 0, 'user': 0, 'total': 0}
+
+        # Streamed replies and their time to first token
+        self.streams = 0
+        self.ttft_ms_total = 0.0
+        
+        # Pipeline stage timings aggregated across requests
+        self.timed_requests = 0
+        self.critical_path_ms_total = 0.0
+        self.stage_totals: Dict[str, Dict] = {}
     
     async def process_message(
         self,
         youtube_url: str,
         user_message: str,
-        chat_history: List[Dict[str, str]] = None
+        chat_history: List[Dict[str, str]] = None,
+        conversation_id: Optional[str] = None,
+        last_seen_seq: Optional[int] = None
     ) -> Dict:
         """
         Process a user message and generate a response in the YouTuber's style
@@ -20,65 +84,45 @@ class ChatService:
         Args:
             youtube_url: YouTube channel URL or ID
             user_message: The user's message
-            chat_history: List of previous messages in the conversation
-            
+            chat_history: Full history, only used to rebuild a conversation
+                the server no longer has
+            conversation_id: ID of an existing conversation to continue
+            last_seen_seq: Number of the conversation's messages the client
+                already has
+        
         Returns:
             Dictionary containing the response and conversation metadata
+        
+        Raises:
+            ConversationResyncRequired: If the conversation must be rebuilt
+                and no chat_history was sent
         """
-        conversation_id = None
+        timer = StageTimer()
+        deadline = Deadline(settings.CHAT_DEADLINE_SECONDS)
+        requested_id = conversation_id
+        conversation = None
+        turn_started = False
         try:
-            # Extract channel ID from URL if needed
-            channel_id = self._extract_channel_id(youtube_url)
-            
-            # Create a conversation ID based on the channel ID
-            conversation_id = f"conv_{hash(channel_id) % 10000}"
-            
-            # Get or create conversation
-            if conversation_id not in self.conversations:
-                self.conversations[conversation_id] = {
-                    'channel_id': channel_id,
-                    'messages': [],
-                    'context': {}
-                }
-            
-            conversation = self.conversations[conversation_id]
-            
-            # Get channel info if not already in cache
-            if channel_id not in self.channel_cache:
-                channel_info = await self.youtube_service.get_channel_info(channel_id)
-                self.channel_cache[channel_id] = channel_info
-                
-                # Add channel info to conversation context
-                conversation['context'].update({
-                    'channel_title': channel_info.get('title', ''),
-                    'channel_description': channel_info.get('description', ''),
-                    'videos': channel_info.get('videos', [])
-                })
-                
-                # Get transcripts for some videos to understand the YouTuber's style
-                video_samples = []
-                for video in channel_info.get('videos', [])[:3]:  # Limit to first 3 videos
-                    try:
-                        transcript = await self.youtube_service.get_video_transcript(video['id'])
-                        if transcript:
-                            video_samples.append({
-                                'title': video['title'],
-                                'transcript': transcript[:2000]  # Limit transcript length
-                            })
-                    except Exception as e:
-                        print(f"Error getting transcript for video {video['id']}: {str(e)}")
-                
-                # Add video samples to context
-                conversation['context']['video_samples'] = video_samples
+            conversation_id, conversation = self.open_conversation(
+                youtube_url, conversation_id, last_seen_seq, chat_history, user_message
+            )
             
-            # Add user message to conversation history
-            conversation['messages'].append({
-                'role': 'user',
-                'content': user_message
-            })
-            
-            # Generate AI response
-            response = await self._generate_ai_response(conversation, chat_history or [])
+            channel_entry = await self._prepare_channel(conversation['channel_id'], timer, deadline)
+            self._start_turn(conversation, channel_entry, user_message)
+            turn_started = True
+            missed_messages = self._missed_messages(
+                conversation, last_seen_seq if conversation_id == requested_id else None
+            )
+
+            # Generate AI response within whatever is left of the request budget
+            response, prompt_tokens = await timer.run(
+                'ai_response',
+                asyncio.wait_for(
+                    self._generate_ai_response(conversation),
+                    timeout=deadline.remaining()
+                ),
+                after=list(timer.stages)
+            )
             
             # Add AI response to conversation history
             conversation['messages'].append({
@@ -89,20 +133,690 @@ class ChatService:
             return {
                 'conversation_id': conversation_id,
                 'response': response,
-                'channel_info': self.channel_cache[channel_id]
+                'channel_info': channel_entry['channel_info'],
+                'context_tier': channel_entry['context_tier'],
+                'timings': self._record_timings(timer),
+                'prompt_tokens': prompt_tokens,
+                'seq': len(conversation['messages']),
+                'missed_messages': missed_messages
             }
-            
+        
+        except ConversationResyncRequired:
+            raise
         except Exception as e:
-            print(f"Error in chat service: {str(e)}")
-            return {
+            if isinstance(e, asyncio.TimeoutError):
+                e = Exception(f"Request deadline of {settings.CHAT_DEADLINE_SECONDS}s exceeded")
+            logger.error(f"Error in chat service: {str(e)}")
+            if turn_started:
+                self._abandon_turn(conversation)
+            error = {
                 'conversation_id': conversation_id or 'error',
                 'response': "I'm having trouble connecting to the YouTuber's content. Please try again later.",
                 'channel_info': {},
+                'timings': self._record_timings(timer),
                 'error': str(e)
             }
+            if conversation is not None:
+                error['seq'] = len(conversation['messages'])
+            return error
+    
+    def open_conversation(
+        self,
+        youtube_url: str,
+        conversation_id: Optional[str] = None,
+        last_seen_seq: Optional[int] = None,
+        chat_history: List[Dict[str, str]] = None,
+        user_message: Optional[str] = None
+    ):
+        """Resolve the channel and return ``(conversation_id, conversation)``
+        
+        The server's copy of a conversation is authoritative: chat_history is
+        ignored while the conversation exists and only seeds a new one when
+        it does not (e.g. after a restart). Long-lived callers (the chat
+        WebSocket) do this once and pass the conversation to stream_turn for
+        every message that follows.
+        
+        Args:
+            youtube_url: YouTube channel URL or ID
+            conversation_id: ID of an existing conversation to continue
+            last_seen_seq: Number of the conversation's messages the client has
+            chat_history: Full history to rebuild the conversation from
+            user_message: The message about to be sent, dropped from the end
+                of chat_history if the client included it there
+        
+        Raises:
+            ConversationResyncRequired: If the client has messages the server
+                does not and sent no chat_history
+        """
+        channel_id = self._extract_channel_id(youtube_url)
+        return self._get_or_create_conversation(
+            conversation_id, channel_id, last_seen_seq, chat_history, user_message
+        )
+    
+    async def stream_turn(
+        self,
+        conversation_id: str,
+        conversation: Dict,
+        user_message: str,
+        last_seen_seq: Optional[int] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Like process_message, but yield the response as it is generated
+        
+        Args:
+            conversation_id: ID of the conversation, from open_conversation
+            conversation: The conversation, from open_conversation
+            user_message: The user's message
+            last_seen_seq: Number of the conversation's messages the client
+                already has, so the ones it missed are sent back
+        
+        Yields:
+            Event dictionaries: one ``start`` with the conversation metadata,
+            a ``token`` per chunk of text, then ``done`` with the full
+            response, timings and time to first token, or ``error``
+        """
+        timer = StageTimer()
+        deadline = Deadline(settings.CHAT_DEADLINE_SECONDS)
+        response_parts: List[str] = []
+        recorded = False
+        turn_started = False
+        try:
+            channel_id = conversation['channel_id']
+            channel_entry = await self._prepare_channel(channel_id, timer, deadline)
+            self._start_turn(conversation, channel_entry, user_message)
+            turn_started = True
+            messages, prompt_tokens = self._build_prompt(conversation)
+            
+            yield {
+                'event': 'start',
+                'conversation_id': conversation_id,
+                'channel_info': channel_entry['channel_info'],
+                'context_tier': channel_entry['context_tier'],
+                'missed_messages': self._missed_messages(conversation, last_seen_seq)
+            }
+            
+            async with aclosing(self.ai_service.stream(messages)) as stream:
+                # Only the wait for the first token is held to the request deadline
+                with timer.measure('first_token', after=list(timer.stages)):
+                    try:
+                        delta = await asyncio.wait_for(stream.__anext__(), timeout=deadline.remaining())
+                    except StopAsyncIteration:
+                        delta = None
+                ttft_ms = timer.stages['first_token']['end_ms']
+                self.streams += 1
+                self.ttft_ms_total += ttft_ms
+                
+                with timer.measure('ai_stream', after=['first_token']):
+                    if delta is not None:
+                        response_parts.append(delta)
+                        yield {'event': 'token', 'content': delta}
+                        async for delta in stream:
+                            response_parts.append(delta)
+                            yield {'event': 'token', 'content': delta}
+            
+            # Add AI response to conversation history
+            conversation['messages'].append({
+                'role': 'assistant',
+                'content': "".join(response_parts)
+            })
+            recorded = True
+            
+            yield {
+                'event': 'done',
+                'conversation_id': conversation_id,
+                'response': "".join(response_parts),
+                'context_tier': channel_entry['context_tier'],
+                'time_to_first_token_ms': round(ttft_ms, 1),
+                'timings': self._record_timings(timer),
+                'prompt_tokens': prompt_tokens,
+                'seq': len(conversation['messages'])
+            }
+        
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                e = Exception(f"Request deadline of {settings.CHAT_DEADLINE_SECONDS}s exceeded")
+            logger.error(f"Error in chat service: {str(e)}")
+            if response_parts and not recorded:
+                conversation['messages'].append({
+                    'role': 'assistant',
+                    'content': "".join(response_parts)
+                })
+                recorded = True
+            elif turn_started:
+                self._abandon_turn(conversation)
+            yield {
+                'event': 'error',
+                'conversation_id': conversation_id,
+                'response': "I'm having trouble connecting to the YouTuber's content. Please try again later.",
+                'timings': self._record_timings(timer),
+                'error': str(e),
+                'seq': len(conversation['messages'])
+            }
+        finally:
+            # Keep whatever was generated, even if the client went away mid-stream
+            if response_parts and not recorded:
+                conversation['messages'].append({
+                    'role': 'assistant',
+                    'content': "".join(response_parts)
+                })
+    
+    async def _prepare_channel(self, channel_id: str, timer: StageTimer, deadline: Deadline) -> Dict:
+        """Return the channel entry to answer from, loading it if needed"""
+        # A conversation opened before its handle was resolved still holds the
+        # handle; look it up under the channel ID it now maps to
+        channel_id = self._canonical_channel_key(channel_id)
+        # Get channel info if not already in cache
+        channel_entry = self.channel_cache.get(channel_id)
+        if channel_entry is None:
+            joined = self.channel_warmups.in_flight(channel_id)
+            warmup = self.channel_warmups.do(
+                channel_id, lambda: self._warm_channel(channel_id, timer=timer)
+            )
+            if joined:
+                # Another request is already loading this channel; just time the wait
+                warmup = timer.run('warmup_wait', warmup)
+            try:
+                channel_entry = await asyncio.wait_for(warmup, timeout=deadline.remaining())
+            except QuotaExceededError:
+                if not joined:
+                    raise
+                # The joined load may have been a low-priority warm-up that was
+                # shed; this request's own calls may still be admitted
+                channel_entry = await asyncio.wait_for(
+                    self.channel_warmups.do(channel_id, lambda: self._warm_channel(channel_id, timer=timer)),
+                    timeout=deadline.remaining()
+                )
+        elif self.channel_cache.is_stale(channel_id):
+            # Serve the stale entry now and revalidate it in the background;
+            # the refresh is low priority so it is shed first when quota runs short
+            self.channel_cache.refresh(
+                channel_id, lambda: self._refresh_channel(channel_id, channel_entry)
+            )
+        channel_id = channel_entry['channel_info'].get('id') or channel_id
+        
+        # Give in-flight transcripts a short budget; if they miss it, answer
+        # from the basic context and let them land for later turns
+        pending_samples = self._sample_tasks.get(channel_id)
+        if pending_samples is not None and channel_entry['context_tier'] != CONTEXT_TIER_FULL:
+            budget = min(
+                settings.TRANSCRIPT_BUDGET_SECONDS,
+                deadline.remaining(settings.CHAT_LLM_RESERVE_SECONDS)
+            )
+            try:
+                channel_entry = await timer.run(
+                    'transcript_wait',
+                    asyncio.wait_for(asyncio.shield(pending_samples), timeout=budget),
+                    after=['context']
+                )
+            except Exception:
+                self.degraded_replies += 1
+        return channel_entry
+    
+    def _start_turn(self, conversation: Dict, channel_entry: Dict, user_message: str) -> None:
+        """Attach the channel's current persona and record the user's message"""
+        conversation['channel_id'] = channel_entry['channel_info'].get('id') or conversation['channel_id']
+        # Conversations follow the channel's current persona, so ones started
+        # before the transcripts landed pick up the richer version
+        conversation['persona'] = channel_entry['persona']
+        
+        # Add user message to conversation history
+        conversation['messages'].append({
+            'role': 'user',
+            'content': user_message
+        })
+    
+    def _abandon_turn(self, conversation: Dict) -> None:
+        """Drop the user message of a turn that got no reply
+        
+        Otherwise the next prompt carries two user turns in a row and the
+        client is sent the failed message back as one it missed.
+        """
+        if conversation['messages'] and conversation['messages'][-1]['role'] == 'user':
+            conversation['messages'].pop()
+    
+    def _missed_messages(self, conversation: Dict, last_seen_seq: Optional[int]) -> List[Dict]:
+        """Messages before the current user turn that the client has not seen"""
+        if last_seen_seq is None:
+            return []
+        return conversation['messages'][last_seen_seq:-1]
+    
+    def _get_or_create_conversation(
+        self,
+        conversation_id: Optional[str],
+        channel_id: str,
+        last_seen_seq: Optional[int] = None,
+        chat_history: List[Dict[str, str]] = None,
+        user_message: Optional[str] = None
+    ):
+        """Return an existing conversation for this channel or start a new one"""
+        conversation = self.conversations.get(conversation_id) if conversation_id else None
+        if conversation is not None and last_seen_seq is not None and last_seen_seq > len(conversation['messages']):
+            # The client is ahead of us, so our copy is missing turns
+            conversation = None
+        # Compare canonical keys: a handle may have resolved to its ID since
+        if conversation is None or self._canonical_channel_key(conversation['channel_id']) != channel_id:
+            messages = self._history_messages(chat_history, user_message)
+            if conversation_id and last_seen_seq and not messages:
+                raise ConversationResyncRequired(
+                    f"Conversation {conversation_id} is not available; resend it with chat_history"
+                )
+            if messages:
+                self.history_resyncs += 1
+            conversation_id = self._generate_conversation_id()
+            conversation = {
+                'channel_id': channel_id,
+                'messages': messages,
+                'persona': None
+            }
+            self.conversations[conversation_id] = conversation
+            # Drop the least recently used conversations beyond the cap
+            while len(self.conversations) > self.max_conversations:
+                self.conversations.popitem(last=False)
+        else:
+            conversation['channel_id'] = channel_id
+            self.conversations.move_to_end(conversation_id)
+        return conversation_id, conversation
+    
+    def _history_messages(
+        self,
+        chat_history: Optional[List[Dict[str, str]]],
+        user_message: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """Turn a client-sent history into conversation messages"""
+        messages = [
+            {'role': message['role'], 'content': message['content']}
+            for message in chat_history or []
+            if message.get('role') in ('user', 'assistant') and message.get('content')
+        ]
+        # Clients may include the message being sent as the last entry
+        if messages and messages[-1] == {'role': 'user', 'content': user_message}:
+            messages.pop()
+        return messages
+    
+    def schedule_warmup(self, youtube_url: str, channel_info: Optional[Dict] = None) -> str:
+        """Warm a channel in the background ahead of the first chat message
+        
+        Args:
+            youtube_url: YouTube channel URL, ID or handle
+            channel_info: Channel info (with ``videos``) the caller already
+                fetched, so the warm-up does not request it again
+            
+        Returns:
+            ``'warm'`` if a fresh entry is already cached and nothing is
+            pending, otherwise the background pool's outcome
+            (``'scheduled'``, ``'already_scheduled'`` or ``'rejected'``)
+        """
+        channel_id = self._extract_channel_id(youtube_url)
+        if (
+            channel_id in self.channel_cache
+            and not self.channel_cache.is_stale(channel_id)
+            and channel_id not in self._sample_tasks
+        ):
+            return WARMUP_ALREADY_WARM
+        if self.background is None:
+            return WARMUP_ALREADY_WARM if channel_id in self.channel_cache else REJECTED
+        return self.background.submit(
+            ('channel', channel_id), lambda: self.warm_channel(channel_id, channel_info)
+        )
+    
+    async def warm_channel(self, youtube_url: str, channel_info: Optional[Dict] = None) -> Dict:
+        """Load a channel and its transcripts into the cache and wait for both
+        
+        Speculative work, so it runs at low quota priority and shares any
+        warm-up a chat request already started for the same channel.
+        """
+        channel_id = self._extract_channel_id(youtube_url)
+        channel_entry = self.channel_cache.get(channel_id)
+        if channel_entry is None:
+            channel_entry = await self.channel_warmups.do(
+                channel_id,
+                lambda: self._warm_channel(channel_id, channel_info=channel_info, priority=PRIORITY_LOW)
+            )
+        elif self.channel_cache.is_stale(channel_id):
+            self.channel_cache.refresh(
+                channel_id, lambda: self._refresh_channel(channel_id, channel_entry)
+            )
+        channel_id = channel_entry['channel_info'].get('id') or channel_id
+        
+        pending_samples = self._sample_tasks.get(channel_id)
+        if pending_samples is not None:
+            channel_entry = await asyncio.shield(pending_samples)
+        return channel_entry
+    
+    async def _warm_channel(
+        self,
+        channel_id: str,
+        timer: Optional[StageTimer] = None,
+        channel_info: Optional[Dict] = None,
+        priority: str = PRIORITY_NORMAL
+    ) -> Dict:
+        """Cache a channel's basic entry and fetch its transcripts in the background
+        
+        Returns as soon as the channel details and uploads are in (or at once
+        when ``channel_info`` is supplied); the transcript task is tracked in
+        ``_sample_tasks`` and upgrades the cached entry to the full context
+        tier when it completes.
+        """
+        timer = timer or StageTimer()
+        if channel_info is not None:
+            channel_info = dict(channel_info)
+        else:
+            channel_info = await self.youtube_service.get_channel_info(channel_id, priority, timer=timer)
+        # A handle is cached under its channel ID, which is the key every
+        # later spelling of the channel resolves to
+        channel_id = channel_info.get('id') or channel_id
+        with timer.measure('context', after=['channel', 'uploads']):
+            channel_entry = self._build_entry(channel_info)
+        self.channel_cache.set(channel_id, channel_entry)
+
+        task = asyncio.ensure_future(self._fill_video_samples(channel_id, channel_entry, priority))
+        self._sample_tasks[channel_id] = task
+        task.add_done_callback(lambda done: self._finish_sample_task(channel_id, done))
+        return channel_entry
+    
+    async def _fill_video_samples(
+        self,
+        channel_id: str,
+        channel_entry: Dict,
+        priority: str = PRIORITY_NORMAL
+    ) -> Dict:
+        """Fetch transcripts for a basic entry and cache the completed entry
+        
+        Runs after the request that started it has reported its timings, so
+        its stages are timed separately and folded into the totals on their own.
+        """
+        timer = StageTimer()
+        try:
+            video_samples = await self._fetch_video_samples(
+                channel_entry['channel_info']['videos'], priority, timer
+            )
+        finally:
+            self._fold_stages(timer.report())
+        channel_entry = self._build_entry(channel_entry['channel_info'], video_samples)
+        self.channel_cache.set(channel_id, channel_entry)
+        return channel_entry
+    
+    def _finish_sample_task(self, channel_id: str, task: asyncio.Task) -> None:
+        if self._sample_tasks.get(channel_id) is task:
+            del self._sample_tasks[channel_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error getting transcripts for channel {channel_id}: {str(task.exception())}")
+    
+    async def _load_channel(
+        self,
+        channel_id: str,
+        priority: str = PRIORITY_NORMAL,
+        timer: Optional[StageTimer] = None
+    ) -> Dict:
+        """Fetch channel info and sample transcripts and build the full entry"""
+        timer = timer or StageTimer()
+        channel_info = await self.youtube_service.get_channel_info(channel_id, priority, timer=timer)
+        video_samples = await self._fetch_video_samples(channel_info['videos'], priority, timer)
+        return self._build_entry(channel_info, video_samples)
+    
+    async def _refresh_channel(
+        self,
+        channel_id: str,
+        channel_entry: Dict,
+        priority: str = PRIORITY_LOW
+    ) -> Dict:
+        """Bring a stale entry up to date without redoing the whole crawl
+        
+        The channel details and the uploads newer than the entry's newest
+        video are fetched side by side; usually that is one page of
+        playlistItems, answered with a free 304 when nothing was uploaded.
+        Transcripts are fetched for the new uploads, and for known uploads
+        without one while the entry is short of samples (e.g. its first
+        transcript fetch failed), so it still reaches the full tier. Falls
+        back to a full reload when the entry has no uploads to anchor on.
+        """
+        newest = channel_entry.get('newest_video')
+        channel_info = channel_entry['channel_info']
+        if not newest or not channel_info.get('id'):
+            self.refreshes['full'] += 1
+            return await self._load_channel(channel_id, priority=priority)
+        
+        youtube = self.youtube_service
+        playlist_id = youtube.uploads_playlist_id(channel_info['id'])
+        details, new_videos = await asyncio.gather(
+            youtube.get_channel_details(channel_info['id'], priority),
+            youtube.get_channel_videos(
+                playlist_id,
+                max_results=10,
+                priority=priority,
+                since_video_id=newest['id'],
+                since_published_at=newest['published_at']
+            )
+        )
+        if details.pop('uploads_playlist_id') != playlist_id:
+            self.refreshes['full'] += 1
+            return await self._load_channel(channel_id, priority=priority)
+        self.refreshes['incremental'] += 1
+        
+        known_ids = {video['id'] for video in channel_info['videos']}
+        new_videos = [video for video in new_videos if video['id'] not in known_ids]
+        self.refreshes['new_videos'] += len(new_videos)
+        details['videos'] = (new_videos + channel_info['videos'])[:10]
+        
+        video_samples = channel_entry['video_samples']
+        candidates = new_videos
+        if len(video_samples) < 3:
+            sampled = {sample.get('video_id') for sample in video_samples}
+            candidates = [video for video in details['videos'] if video['id'] not in sampled]
+        if candidates:
+            new_samples = await self._fetch_video_samples(candidates, priority, StageTimer())
+            video_samples = (new_samples + video_samples)[:3]
+        return self._build_entry(details, video_samples)
+    
+    def _build_entry(self, channel_info: Dict, video_samples: Optional[List[Dict]] = None) -> Dict:
+        """Build a channel cache entry and compile its persona
+        
+        Every new version of a channel (basic, with transcripts, refreshed)
+        goes through here once, so messages never rebuild the persona.
+        """
+        video_samples = video_samples or []
+        videos = channel_info.get('videos', [])
+        return {
+            'channel_info': channel_info,
+            'video_samples': video_samples,
+            # Without any transcript the style context is no richer than before
+            'context_tier': CONTEXT_TIER_FULL if video_samples else CONTEXT_TIER_BASIC,
+            'persona': self._compile_persona(self._build_context(channel_info, video_samples)),
+            # Where the next incremental refresh picks up from
+            'newest_video': {
+                'id': videos[0]['id'],
+                'published_at': videos[0].get('published_at', '')
+            } if videos else None
+        }
+    
+    def _compile_persona(self, context: Dict) -> Dict:
+        """Render the system prompt for a channel version and count its tokens
+        
+        Transcripts are kept as separately counted excerpts so each reply can
+        include as many as its token budget allows. Counts made before the
+        model's encoder has loaded are estimates and are left as None, so
+        replies count them afresh rather than reuse the estimate for as long
+        as the entry is cached.
+        """
+        system_prompt = self.ai_service.build_system_message(
+            youtuber_style=self._generate_youtuber_style(context),
+            context=self._describe_channel(context)
+        )
+        token_count, estimated = self.ai_service.count_tokens_many([system_prompt])[0]
+        return {
+            'system_prompt': system_prompt,
+            'token_count': None if estimated else token_count,
+            'excerpts': self._build_excerpts(context.get('video_samples', []))
+        }
+    
+    def _build_excerpts(self, video_samples: List[Dict]) -> List[Dict]:
+        """Cut sample transcripts into token-counted excerpts
+        
+        Excerpts alternate between videos so the leading ones cover every
+        sample. Stops once the excerpts could fill the whole prompt budget on
+        their own, since no reply could use more.
+        """
+        chunked = []
+        for video in video_samples:
+            words = video['transcript'].split()
+            chunked.append([
+                {'title': video['title'], 'text': " ".join(words[i:i + EXCERPT_WORDS])}
+                for i in range(0, len(words), EXCERPT_WORDS)
+            ])
+        
+        interleaved = [
+            chunks[position]
+            for position in range(max((len(chunks) for chunks in chunked), default=0))
+            for chunks in chunked
+            if position < len(chunks)
+        ]
+        counts = self.ai_service.count_tokens_many(
+            [self.ai_service.format_excerpt(excerpt) for excerpt in interleaved]
+        )
+        
+        excerpts = []
+        total_tokens = 0
+        for excerpt, (tokens, estimated) in zip(interleaved, counts):
+            if not estimated:
+                excerpt['tokens'] = tokens
+            excerpts.append(excerpt)
+            total_tokens += tokens
+            if total_tokens >= self.ai_service.prompt_budget:
+                break
+        return excerpts
+
+    async def _fetch_video_samples(
+        self,
+        videos: List[Dict],
+        priority: str,
+        timer: StageTimer
+    ) -> List[Dict]:
+        """Pick sample videos and fetch their transcripts concurrently"""
+        sample_videos = await timer.run(
+            'enrich', self._select_sample_videos(videos, priority), after=['uploads']
+        )
+        transcripts = await asyncio.gather(
+            *[
+                timer.run(
+                    f"transcript:{video['id']}",
+                    self.youtube_service.get_video_transcript(video['id']),
+                    after=['enrich']
+                )
+                for video in sample_videos
+            ],
+            return_exceptions=True
+        )
+        
+        video_samples = []
+        for video, transcript in zip(sample_videos, transcripts):
+            if isinstance(transcript, Exception):
+                logger.warning(f"Error getting transcript for video {video['id']}: {str(transcript)}")
+            elif transcript:
+                video_samples.append({
+                    'video_id': video['id'],
+                    'title': video['title'],
+                    'transcript': transcript
+                })
+        return video_samples
+    
+    async def _select_sample_videos(
+        self,
+        videos: List[Dict],
+        priority: str = PRIORITY_NORMAL,
+        limit: int = 3
+    ) -> List[Dict]:
+        """Pick the videos whose transcripts best show the YouTuber's style
+        
+        Candidates are ranked using batched videos.list metadata before any
+        transcript is scraped: uploads with captions first, then regular-length
+        videos (Shorts and multi-hour streams carry little usable speech), then
+        the most recent. Falls back to the newest uploads if enrichment fails.
+        """
+        if len(videos) <= limit:
+            return videos
+        try:
+            enriched = await self.youtube_service.enrich_videos([video['id'] for video in videos], priority)
+        except Exception as e:
+            logger.warning(f"Error enriching videos: {str(e)}")
+            return videos[:limit]
+        
+        def rank(indexed_video):
+            index, video = indexed_video
+            record = enriched.get(video['id'])
+            if record is None:
+                return (2, 1, index)
+            duration = record['duration_seconds']
+            regular_length = duration is not None and 90 <= duration <= 2 * 3600
+            return (0 if record['has_captions'] else 1, 0 if regular_length else 1, index)
+        
+        ranked = sorted(enumerate(videos), key=rank)
+        return [video for _, video in ranked[:limit]]
+    
+    def _build_context(self, channel_info: Dict, video_samples: List[Dict]) -> Dict:
+        """Collect the channel data a persona is built from"""
+        return {
+            'channel_title': channel_info.get('title', ''),
+            'channel_description': channel_info.get('description', ''),
+            'videos': channel_info.get('videos', []),
+            'video_samples': video_samples
+        }
+    
+    def _record_timings(self, timer: StageTimer) -> Dict:
+        """Fold a request's stage timings into the running totals and return them"""
+        report = timer.report()
+        self.timed_requests += 1
+        self.critical_path_ms_total += report['critical_path_ms']
+        self._fold_stages(report)
+        return report
+    
+    def _fold_stages(self, report: Dict) -> None:
+        """Add the finished stages of a timing report to the per-stage totals"""
+        for name, stage in report['stages'].items():
+            if stage['duration_ms'] is None:
+                continue
+            # Per-video transcript stages are aggregated together
+            totals = self.stage_totals.setdefault(name.split(':', 1)[0], {'count': 0, 'total_ms': 0.0})
+            totals['count'] += 1
+            totals['total_ms'] += stage['duration_ms']
+    
+    def stats(self) -> Dict:
+        """Return cache, conversation and pipeline timing counters"""
+        return {
+            'channel_cache': self.channel_cache.stats(),
+            'conversations': len(self.conversations),
+            'history_resyncs': self.history_resyncs,
+            'channel_warmups': self.channel_warmups.stats(),
+            'transcripts_pending': len(self._sample_tasks),
+            'degraded_replies': self.degraded_replies,
+            'streaming': {
+                'streams': self.streams,
+                'avg_time_to_first_token_ms': round(self.ttft_ms_total / self.streams, 1) if self.streams else 0.0,
+            },
+            'avg_prompt_tokens': {
+                section: round(tokens / self.prompt_replies, 1) if self.prompt_replies else 0.0
+                for section, tokens in self.prompt_token_totals.items()
+            },
+            'refreshes': dict(self.refreshes),
+            'pipeline': {
+                'requests': self.timed_requests,
+                'avg_critical_path_ms': round(self.critical_path_ms_total / self.timed_requests, 1) if self.timed_requests else 0.0,
+                'stages': {
+                    name: {
+                        'count': totals['count'],
+                        'avg_ms': round(totals['total_ms'] / totals['count'], 1),
+                    }
+                    for name, totals in self.stage_totals.items()
+                },
+            },
+        }
     
     def _extract_channel_id(self, youtube_url: str) -> str:
         """Extract channel ID from YouTube URL"""
+        return self._canonical_channel_key(self._parse_channel_identifier(youtube_url))
+    
+    def _parse_channel_identifier(self, youtube_url: str) -> str:
+        """Pull the channel ID or handle out of a YouTube URL"""
+        youtube_url = youtube_url.strip()
         # If it's already a channel ID (not a URL), return as is
         if not ('youtube.com' in youtube_url or 'youtu.be' in youtube_url):
             return youtube_url
@@ -113,51 +827,94 @@ class ChatService:
             return youtube_url.split('channel/')[-1].split('?')[0]
         elif 'youtube.com/c/' in youtube_url or 'youtube.com/user/' in youtube_url:
             return youtube_url.split('/')[-1].split('?')[0]
+        elif 'youtube.com/@' in youtube_url:
+            return youtube_url.split('youtube.com/')[-1].split('/')[0].split('?')[0]
         else:
             # Default to using the URL as-is if we can't parse it
             return youtube_url
+    
+    def _canonical_channel_key(self, identifier: str) -> str:
+        """Normalise an identifier so every spelling of a channel shares one key.
+        
+        Channel IDs (UC...) are case-sensitive and kept as-is. Handles whose
+        channel ID is known (from the handle map) are keyed by that ID;
+        unresolved ones are case-insensitive, so '@Name', 'name' and 'NAME'
+        all map to 'name'.
+        """
+        identifier = identifier.strip().rstrip('/')
+        if identifier.startswith('@'):
+            identifier = identifier[1:]
+        if is_channel_id(identifier):
+            return identifier
+        handle = identifier.lower()
+        return self.youtube_service.known_channel_id(handle) or handle
             
-    async def _generate_ai_response(self, conversation: Dict, chat_history: List[Dict[str, str]]) -> str:
-        """Generate AI response using the AI service"""
-        # Build additional context string
+    async def _generate_ai_response(self, conversation: Dict):
+        """Generate AI response using the AI service
+        
+        Returns:
+            The response text and the prompt tokens used by each section
+        """
+        messages, prompt_tokens = self._build_prompt(conversation)
+        
+        response = await self.ai_service.complete(messages)
+        
+        return response, prompt_tokens
+    
+    def _build_prompt(self, conversation: Dict):
+        """Assemble the chat messages for the conversation's latest user message"""
+        # The stored conversation is the only history (excluding the latest user message)
+        history = conversation['messages'][:-1]
+
+        prompt = conversation['messages'][-1]['content']
+        persona = conversation['persona']
+
+        # The assembler keeps as much recent history and as many excerpts as fit
+        messages, prompt_tokens = self.ai_service.assemble_prompt(
+            persona['system_prompt'],
+            prompt,
+            conversation_history=history,
+            excerpts=self._rank_excerpts(persona['excerpts'], prompt),
+            system_tokens=persona['token_count']
+        )
+        self.prompt_replies += 1
+        for section in self.prompt_token_totals:
+            self.prompt_token_totals[section] += prompt_tokens[section]
+        
+        return messages, prompt_tokens
+
+    def _rank_excerpts(self, excerpts: List[Dict], query: str) -> List[Dict]:
+        """Order excerpts by how many of the message's words they contain"""
+        query_words = {word for word in re.findall(r"\w+", query.lower()) if len(word) > 3}
+        if not query_words:
+            return excerpts
+
+        def overlap(excerpt):
+            return len(query_words.intersection(re.findall(r"\w+", excerpt['text'].lower())))
+
+        # sorted() is stable, so ties keep the interleaved order
+        return sorted(excerpts, key=overlap, reverse=True)
+    
+    def _describe_channel(self, context: Dict) -> str:
+        """Summarise the channel's title, description and recent videos"""
         context_parts = []
-        channel_title = conversation['context'].get('channel_title', '')
-        channel_description = conversation['context'].get('channel_description', '')
+        channel_title = context.get('channel_title', '')
+        channel_description = context.get('channel_description', '')
         if channel_title:
             context_parts.append(f"Channel title: {channel_title}")
         if channel_description:
             context_parts.append(f"Channel description: {channel_description}")
 
-        recent_videos = conversation['context'].get('videos', [])[:3]
+        recent_videos = context.get('videos', [])[:3]
         if recent_videos:
             recent_titles = ", ".join([video.get('title', '') for video in recent_videos if video.get('title')])
             if recent_titles:
                 context_parts.append(f"Recent videos: {recent_titles}")
 
-        additional_context = "\n".join(context_parts)
-
-        # Combine provided chat history with stored conversation history (excluding latest user message)
-        combined_history = (chat_history or []) + conversation['messages'][:-1]
-        # Limit history to avoid excessive context
-        combined_history = combined_history[-6:]
-
-        # Generate style description
-        youtuber_style = self._generate_youtuber_style(conversation['context'])
-
-        prompt = conversation['messages'][-1]['content']
-
-        response = await self.ai_service.generate_response(
-            prompt=prompt,
-            context=additional_context,
-            conversation_history=combined_history,
-            youtuber_style=youtuber_style
-        )
-
-        return response
+        return "\n".join(context_parts)
     
     def _generate_conversation_id(self) -> str:
         """Generate a unique conversation ID"""
-        import uuid
         return str(uuid.uuid4())
     
     def _generate_youtuber_style(self, context: Dict) -> str:
@@ -188,11 +945,6 @@ class ChatService:
             
             if topics:
                 style_parts.append(f"Common content types: {', '.join(topics)}.")
-            
-            # Add sample transcript excerpts
-            style_parts.append("Sample of the YouTuber's speech patterns:")
-            for i, video in enumerate(context.get('video_samples', [])[:2], 1):
-                style_parts.append(f"From '{video['title']}': {video['transcript'][:300]}...")
         
         return "\n".join(style_parts)
 
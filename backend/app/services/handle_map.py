@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class HandleMap:
+    """Persistent handle -> channel ID map with negative caching.
+
+    Handles rarely move between channels, so resolved mappings are kept for a
+    long time. Handles that do not exist are remembered for a shorter period so
+    repeated lookups of a typo cost nothing. The map is a small JSON file that
+    is rewritten whenever it changes; on the event loop the write happens in a
+    worker thread, and changes made while one is in progress are written
+    together once it finishes.
+    """
+
+    def __init__(self, path: Optional[str], ttl: float, negative_ttl: float):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # handle -> (channel_id or None, expires_at epoch seconds)
+        self._entries: Dict[str, Tuple[Optional[str], float]] = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._pending_save: Optional[asyncio.Future] = None
+        self._load()
+
+    @staticmethod
+    def normalise(handle: str) -> str:
+        """Handles are case-insensitive and may be written with or without '@'"""
+        return handle.strip().lstrip('@').lower()
+
+    def lookup(self, handle: str) -> Tuple[bool, Optional[str]]:
+        """Return ``(known, channel_id)``; a known handle with no ID does not exist."""
+        key = self.normalise(handle)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < time.time():
+            self.misses += 1
+            return False, None
+        if entry[0] is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return True, entry[0]
+
+    def set(self, handle: str, channel_id: Optional[str]) -> None:
+        """Remember a resolution; ``channel_id=None`` records a missing handle."""
+        ttl = self.ttl if channel_id else self.negative_ttl
+        self._entries[self.normalise(handle)] = (channel_id, time.time() + ttl)
+        self._schedule_save()
+
+    def _schedule_save(self) -> None:
+        if not self.path:
+            return
+        self._dirty = True
+        if self._pending_save is not None:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        self._pending_save = asyncio.ensure_future(self._save_in_background())
+
+    async def _save_in_background(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self._dirty:
+                self._dirty = False
+                await loop.run_in_executor(None, self._write, dict(self._entries))
+        finally:
+            self._pending_save = None
+
+    async def flush(self) -> None:
+        """Wait until every change so far has been written."""
+        if self._pending_save is not None:
+            await asyncio.shield(self._pending_save)
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            now = time.time()
+            self._entries = {
+                handle: (channel_id, expires_at)
+                for handle, (channel_id, expires_at) in raw.items()
+                if expires_at > now
+            }
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load handle map from {self.path}: {str(e)}")
+
+    def save(self) -> None:
+        """Write the map now (blocking)."""
+        self._dirty = False
+        self._write(self._entries)
+
+    def _write(self, entries: Dict[str, Tuple[Optional[str], float]]) -> None:
+        if not self.path:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            tmp_path.replace(self.path)
+        except OSError as e:
+            logger.warning(f"Could not save handle map to {self.path}: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,137 @@
+import logging
+import time
+from typing import Dict, Optional
+import httpx
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 support in httpx needs the optional ``h2`` package."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class PooledHTTPClient:
+    """Long-lived ``httpx.AsyncClient`` shared by every outbound API call.
+
+    The client is opened once in the FastAPI lifespan and closed on shutdown so
+    keep-alive connections (and HTTP/2 streams) are reused across requests
+    instead of paying a TLS handshake per call.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = None,
+        max_keepalive_connections: int = None,
+        keepalive_expiry: float = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        write_timeout: float = None,
+        pool_timeout: float = None,
+        http2: bool = None
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry or settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout or settings.HTTP_CONNECT_TIMEOUT,
+            read=read_timeout or settings.HTTP_READ_TIMEOUT,
+            write=write_timeout or settings.HTTP_WRITE_TIMEOUT,
+            pool=pool_timeout or settings.HTTP_POOL_TIMEOUT,
+        )
+        self.http2 = settings.HTTP_HTTP2 if http2 is None else http2
+        if self.http2 and not _http2_available():
+            logger.warning("HTTP/2 requested but 'h2' is not installed; falling back to HTTP/1.1")
+            self.http2 = False
+
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Utilisation counters
+        self.requests_total = 0
+        self.errors_total = 0
+        self.pool_timeouts = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_request_ms = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None and not self._client.is_closed
+
+    async def start(self) -> None:
+        """Open the underlying client (no-op if it is already open)."""
+        if self.is_open:
+            return
+        self._client = httpx.AsyncClient(
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=self.http2,
+        )
+        logger.info(
+            "HTTP client pool started (max_connections=%s, keepalive=%s, http2=%s)",
+            self.limits.max_connections, self.limits.max_keepalive_connections, self.http2
+        )
+
+    async def close(self) -> None:
+        """Close the underlying client and release pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("HTTP client pool closed")
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """Issue a GET through the shared pool, recording utilisation stats."""
+        if not self.is_open:
+            # Used outside the app lifespan (scripts, shell); open lazily.
+            await self.start()
+
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        start_time = time.perf_counter()
+        try:
+            return await self._client.get(url, **kwargs)
+        except httpx.PoolTimeout:
+            self.pool_timeouts += 1
+            self.errors_total += 1
+            raise
+        except httpx.HTTPError:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.total_request_ms += (time.perf_counter() - start_time) * 1000
+
+    def _connection_counts(self) -> Dict[str, int]:
+        """Best-effort view of the transport's connection pool."""
+        pool = getattr(getattr(self._client, '_transport', None), '_pool', None)
+        connections = getattr(pool, 'connections', None)
+        if connections is None:
+            return {'open': 0, 'idle': 0}
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {'open': len(connections), 'idle': idle}
+
+    def stats(self) -> Dict:
+        """Return pool configuration and utilisation counters."""
+        connections = self._connection_counts() if self.is_open else {'open': 0, 'idle': 0}
+        return {
+            'open': self.is_open,
+            'http2': self.http2,
+            'max_connections': self.limits.max_connections,
+            'max_keepalive_connections': self.limits.max_keepalive_connections,
+            'connections_open': connections['open'],
+            'connections_idle': connections['idle'],
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'requests_total': self.requests_total,
+            'errors_total': self.errors_total,
+            'pool_timeouts': self.pool_timeouts,
+            'avg_request_ms': round(self.total_request_ms / self.requests_total, 2) if self.requests_total else 0.0,
+        }
@@ -0,0 +1,242 @@
+"""
+Chat completion backends.
+
+``AIService`` talks to a language model through an ``LLMBackend``: the
+OpenAI API in production, or ``StubBackend``, a local stand-in with
+simulated latency, throughput and failures for load tests and benchmarks
+that must not pay for real completions or depend on the network. The
+backend is picked with ``LLM_BACKEND``.
+"""
+import asyncio
+import logging
+import math
+import random
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional
+
+import openai
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_OPENAI = 'openai'
+BACKEND_STUB = 'stub'
+
+LATENCY_FIXED = 'fixed'
+LATENCY_UNIFORM = 'uniform'
+LATENCY_NORMAL = 'normal'
+LATENCY_LOGNORMAL = 'lognormal'
+
+
+class LLMBackendError(Exception):
+    """A completion failed in the backend"""
+
+
+class LLMBackend(ABC):
+    """Interface for chat completion backends.
+
+    Both methods take chat messages in the OpenAI format and raise on
+    failure; fallback replies are AIService's concern.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+
+    @abstractmethod
+    async def complete(self, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+        """Return the full reply"""
+
+    @abstractmethod
+    def stream(self, messages: List[Dict], temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        """Yield the reply in chunks as it is generated"""
+
+    def stats(self) -> Dict:
+        return {
+            'backend': self.name,
+            'requests': self.requests,
+            'errors': self.errors,
+        }
+
+
+class OpenAIBackend(LLMBackend):
+    """Completions from the OpenAI chat API"""
+
+    name = BACKEND_OPENAI
+
+    def __init__(self, api_key: str, model: str):
+        super().__init__()
+        if not api_key:
+            raise ValueError("OpenAI API key is not configured")
+        # Passed per request rather than through the global openai.api_key
+        self.api_key = api_key
+        self.model = model
+
+    async def complete(self, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+        self.requests += 1
+        try:
+            response = await openai.ChatCompletion.acreate(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                api_key=self.api_key,
+            )
+        except Exception:
+            self.errors += 1
+            raise
+        return response.choices[0].message['content'].strip()
+
+    async def stream(self, messages: List[Dict], temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        self.requests += 1
+        try:
+            response = await openai.ChatCompletion.acreate(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                api_key=self.api_key,
+                stream=True,
+            )
+            async for chunk in response:
+                content = chunk.choices[0].delta.get('content')
+                if content:
+                    yield content
+        except Exception:
+            self.errors += 1
+            raise
+
+
+class StubBackend(LLMBackend):
+    """Local stand-in that simulates a model without calling one.
+
+    Each request waits for a time-to-first-token drawn from the latency
+    distribution, then produces its reply at ``tokens_per_second`` (one
+    word per token). A request fails with probability ``error_rate``
+    before its first token. Replies are built from the user's message and
+    a seeded generator, so a run with the same seed and requests is
+    repeatable.
+
+    Args:
+        latency_ms: Median time to first token
+        latency_distribution: ``fixed``, ``uniform`` (latency_ms +/- spread
+            * latency_ms), ``normal`` (standard deviation spread *
+            latency_ms) or ``lognormal`` (sigma spread)
+        latency_spread: Width of the distribution, relative to latency_ms
+        tokens_per_second: Generation speed after the first token (0 = instant)
+        reply_tokens: Reply length, capped by the request's max_tokens
+        error_rate: Fraction of requests that fail
+        seed: Seed for latencies, failures and reply text
+    """
+
+    name = BACKEND_STUB
+
+    WORDS = (
+        "honestly", "so", "the", "thing", "is", "guys", "really", "video",
+        "let's", "talk", "about", "that", "because", "it", "was", "wild",
+        "and", "I", "think", "you", "should", "try", "this", "yourself",
+    )
+
+    def __init__(
+        self,
+        latency_ms: float = 400,
+        latency_distribution: str = LATENCY_LOGNORMAL,
+        latency_spread: float = 0.5,
+        tokens_per_second: float = 50,
+        reply_tokens: int = 80,
+        error_rate: float = 0.0,
+        seed: Optional[int] = 0
+    ):
+        super().__init__()
+        if latency_distribution not in (LATENCY_FIXED, LATENCY_UNIFORM, LATENCY_NORMAL, LATENCY_LOGNORMAL):
+            raise ValueError(f"Unknown stub latency distribution: {latency_distribution}")
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_spread = latency_spread
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate
+        self.seed = seed
+        self._random = random.Random(seed)
+        self.tokens_generated = 0
+        self.latency_ms_total = 0.0
+
+    def _sample_latency(self) -> float:
+        """Draw a time to first token, in seconds"""
+        if self.latency_distribution == LATENCY_UNIFORM:
+            spread = self.latency_ms * self.latency_spread
+            latency_ms = self._random.uniform(self.latency_ms - spread, self.latency_ms + spread)
+        elif self.latency_distribution == LATENCY_NORMAL:
+            latency_ms = self._random.gauss(self.latency_ms, self.latency_ms * self.latency_spread)
+        elif self.latency_distribution == LATENCY_LOGNORMAL:
+            latency_ms = self._random.lognormvariate(math.log(max(self.latency_ms, 1e-3)), self.latency_spread)
+        else:
+            latency_ms = self.latency_ms
+        latency_ms = max(latency_ms, 0.0)
+        self.latency_ms_total += latency_ms
+        return latency_ms / 1000
+
+    def _reply_words(self, messages: List[Dict], max_tokens: int) -> List[str]:
+        prompt = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), "")
+        words = ["(stub)", "You", "said:"] + prompt.split()[:20]
+        count = max(min(self.reply_tokens, max_tokens), 1)
+        while len(words) < count:
+            words.append(self._random.choice(self.WORDS))
+        return words[:count]
+
+    async def _start(self, messages: List[Dict], max_tokens: int) -> List[str]:
+        """Count the request, wait out the latency and return the reply words"""
+        self.requests += 1
+        latency = self._sample_latency()
+        failed = self._random.random() < self.error_rate
+        words = self._reply_words(messages, max_tokens)
+        await asyncio.sleep(latency)
+        if failed:
+            self.errors += 1
+            raise LLMBackendError("Simulated backend error")
+        return words
+
+    async def complete(self, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+        words = await self._start(messages, max_tokens)
+        if self.tokens_per_second > 0:
+            await asyncio.sleep((len(words) - 1) / self.tokens_per_second)
+        self.tokens_generated += len(words)
+        return " ".join(words)
+
+    async def stream(self, messages: List[Dict], temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        words = await self._start(messages, max_tokens)
+        for i, word in enumerate(words):
+            if i and self.tokens_per_second > 0:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            self.tokens_generated += 1
+            yield word if i == 0 else " " + word
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats.update({
+            'latency_distribution': self.latency_distribution,
+            'avg_latency_ms': round(self.latency_ms_total / self.requests, 1) if self.requests else 0.0,
+            'tokens_generated': self.tokens_generated,
+        })
+        return stats
+
+
+def create_backend(name: str, api_key: Optional[str] = None, model: Optional[str] = None) -> LLMBackend:
+    """Build the backend named by ``LLM_BACKEND`` from the current settings"""
+    if name == BACKEND_OPENAI:
+        return OpenAIBackend(api_key, model or settings.OPENAI_MODEL)
+    if name == BACKEND_STUB:
+        logger.info("Using the stub LLM backend; replies are simulated")
+        return StubBackend(
+            latency_ms=settings.STUB_LATENCY_MS,
+            latency_distribution=settings.STUB_LATENCY_DISTRIBUTION,
+            latency_spread=settings.STUB_LATENCY_SPREAD,
+            tokens_per_second=settings.STUB_TOKENS_PER_SECOND,
+            reply_tokens=settings.STUB_REPLY_TOKENS,
+            error_rate=settings.STUB_ERROR_RATE,
+            seed=settings.STUB_SEED
+        )
+    raise ValueError(f"Unknown LLM backend: {name}")
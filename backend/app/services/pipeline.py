@@ -0,0 +1,89 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Dict, Iterable, List, Optional
+
+
+class Deadline:
+    """A single time budget shared by every stage of a request."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self, reserve: float = 0.0) -> float:
+        """Seconds left, keeping ``reserve`` seconds back for later stages."""
+        return max(self.expires_at - time.monotonic() - reserve, 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class StageTimer:
+    """Record when each stage of a request ran and what it waited on.
+
+    Stages declare the stages they depend on (``after``), which lets the
+    timer report the critical path: starting from the stage that finished
+    last, repeatedly step to the dependency that finished last.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self.origin) * 1000
+
+    async def run(self, name: str, awaitable: Awaitable, after: Iterable[str] = ()) -> Any:
+        """Await ``awaitable`` as stage ``name``."""
+        with self.measure(name, after):
+            return await awaitable
+
+    def start(self, name: str, awaitable: Awaitable, after: Iterable[str] = ()) -> asyncio.Task:
+        """Schedule ``awaitable`` as stage ``name`` and return its task."""
+        return asyncio.ensure_future(self.run(name, awaitable, after))
+
+    @contextmanager
+    def measure(self, name: str, after: Iterable[str] = ()):
+        """Time a synchronous block (or an await inside it) as stage ``name``."""
+        stage = {'start_ms': self._now_ms(), 'end_ms': None, 'after': list(after), 'ok': True}
+        self.stages[name] = stage
+        try:
+            yield stage
+        except BaseException:
+            stage['ok'] = False
+            raise
+        finally:
+            stage['end_ms'] = self._now_ms()
+
+    def critical_path(self) -> List[str]:
+        finished = {name: stage for name, stage in self.stages.items() if stage['end_ms'] is not None}
+        if not finished:
+            return []
+        current: Optional[str] = max(finished, key=lambda name: finished[name]['end_ms'])
+        path = []
+        while current is not None:
+            path.append(current)
+            dependencies = [dep for dep in finished[current]['after'] if dep in finished and dep not in path]
+            current = max(dependencies, key=lambda dep: finished[dep]['end_ms']) if dependencies else None
+        return list(reversed(path))
+
+    def report(self) -> Dict:
+        """Per-stage timings plus the critical path, in milliseconds."""
+        path = self.critical_path()
+        stages = {
+            name: {
+                'start_ms': round(stage['start_ms'], 1),
+                'end_ms': round(stage['end_ms'], 1) if stage['end_ms'] is not None else None,
+                'duration_ms': round(stage['end_ms'] - stage['start_ms'], 1) if stage['end_ms'] is not None else None,
+                'ok': stage['ok'],
+            }
+            for name, stage in self.stages.items()
+        }
+        return {
+            'total_ms': round(self._now_ms(), 1),
+            'stages': stages,
+            'critical_path': path,
+            'critical_path_ms': round(sum(stages[name]['duration_ms'] for name in path), 1),
+        }
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_WARMING = 'warming'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class ChannelPrewarmer:
+    """Warm a fixed list of channels once at startup.
+
+    Runs as a background task so the app is ready to serve before it
+    finishes; at most ``concurrency`` channels are loaded at a time. Each
+    channel goes through ``ChatService.warm_channel``, so chat requests that
+    arrive for a channel mid-warm-up join the same fetch.
+    """
+
+    def __init__(self, chat_service, channels: List[str], concurrency: int = 2):
+        self.chat_service = chat_service
+        self.channels = list(dict.fromkeys(channels))
+        self.concurrency = max(concurrency, 1)
+        self.status: Dict[str, str] = {channel: STATUS_PENDING for channel in self.channels}
+        self.errors: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, ready: Optional[Awaitable] = None) -> None:
+        """Schedule the warm-up without waiting for it.
+
+        Args:
+            ready: Awaited before warming starts (e.g. the token encoder
+                load, so prewarmed personas get exact token counts)
+        """
+        if self.channels and self._task is None:
+            self._task = asyncio.ensure_future(self._run(ready))
+
+    async def _run(self, ready: Optional[Awaitable] = None) -> None:
+        if ready is not None:
+            await asyncio.gather(ready, return_exceptions=True)
+        self.started_at = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        logger.info(f"Prewarming {len(self.channels)} channels")
+        await asyncio.gather(*[self._warm(channel, semaphore) for channel in self.channels])
+        self.finished_at = time.monotonic()
+        done = sum(1 for status in self.status.values() if status == STATUS_DONE)
+        logger.info(
+            f"Prewarmed {done}/{len(self.channels)} channels in {self.finished_at - self.started_at:.1f}s"
+        )
+
+    async def _warm(self, channel: str, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            self.status[channel] = STATUS_WARMING
+            try:
+                await self.chat_service.warm_channel(channel)
+                self.status[channel] = STATUS_DONE
+            except Exception as e:
+                self.status[channel] = STATUS_FAILED
+                self.errors[channel] = str(e)
+                logger.warning(f"Could not prewarm channel {channel}: {str(e)}")
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def progress(self) -> Dict:
+        counts = {STATUS_PENDING: 0, STATUS_WARMING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for status in self.status.values():
+            counts[status] += 1
+        if not self.channels:
+            state = 'disabled'
+        elif self.finished_at is not None:
+            state = 'complete'
+        elif self.started_at is not None:
+            state = 'running'
+        else:
+            state = 'pending'
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return {
+            'state': state,
+            'total': len(self.channels),
+            'done': counts[STATUS_DONE],
+            'failed': counts[STATUS_FAILED],
+            'warming': counts[STATUS_WARMING],
+            'pending': counts[STATUS_PENDING],
+            'elapsed_seconds': round(end - self.started_at, 1) if self.started_at is not None else None,
+            'errors': dict(self.errors),
+        }
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from zoneinfo import ZoneInfo
+    # The YouTube Data API quota resets at midnight Pacific time
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:  # tzdata missing (e.g. bare Windows installs)
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+# Documented unit cost per call of each YouTube Data API list method
+QUOTA_COSTS = {
+    'search': 100,
+    'channels': 1,
+    'playlistItems': 1,
+    'videos': 1,
+}
+
+PRIORITY_HIGH = 'high'
+PRIORITY_NORMAL = 'normal'
+PRIORITY_LOW = 'low'
+
+
+class QuotaExceededError(Exception):
+    """Raised when a call is shed to protect the remaining daily quota."""
+
+
+class QuotaLedger:
+    """Track YouTube Data API quota usage and decide which calls to admit.
+
+    Every call is charged its documented unit cost against the current quota
+    day. Calls are admitted by priority: low-priority work (background
+    refreshes, prewarming) stops once usage crosses ``low_priority_floor`` of
+    the budget, normal traffic at ``normal_priority_floor``, and high-priority
+    calls run until the budget is gone. Callers that have a cached copy should
+    serve it when a call is shed.
+
+    Admitting a call reserves its units until the caller either charges it
+    or refunds it (the call never reached the API, or cost nothing), so
+    concurrent calls near a floor cannot all pass the check and overshoot it.
+    """
+
+    def __init__(
+        self,
+        daily_limit: int,
+        low_priority_floor: float = 0.5,
+        normal_priority_floor: float = 0.1,
+        state_path: Optional[str] = None,
+        history_days: int = 7
+    ):
+        self.daily_limit = daily_limit
+        self.reserves = {
+            PRIORITY_LOW: int(daily_limit * low_priority_floor),
+            PRIORITY_NORMAL: int(daily_limit * normal_priority_floor),
+            PRIORITY_HIGH: 0,
+        }
+        self.state_path = Path(state_path) if state_path else None
+        self.history_days = history_days
+
+        # quota day (ISO date) -> {'total': units, 'calls': n, resource: units, ...}
+        self.days: 'OrderedDict[str, Dict[str, int]]' = OrderedDict()
+        self.admitted = {PRIORITY_HIGH: 0, PRIORITY_NORMAL: 0, PRIORITY_LOW: 0}
+        self.shed = {PRIORITY_HIGH: 0, PRIORITY_NORMAL: 0, PRIORITY_LOW: 0}
+        # Units held by admitted calls that have not been charged or refunded
+        self.in_flight = 0
+        self._last_saved = 0.0
+        self._pending_save: Optional[asyncio.Future] = None
+
+        self._load()
+
+    def _quota_day(self) -> str:
+        return datetime.now(QUOTA_TIMEZONE).date().isoformat()
+
+    def _today(self) -> Dict[str, int]:
+        day = self._quota_day()
+        if day not in self.days:
+            self.days[day] = {'total': 0, 'calls': 0}
+            while len(self.days) > self.history_days:
+                self.days.popitem(last=False)
+        return self.days[day]
+
+    @staticmethod
+    def cost(resource: str) -> int:
+        return QUOTA_COSTS.get(resource, 1)
+
+    def used(self) -> int:
+        return self._today()['total']
+
+    def remaining(self) -> int:
+        return max(self.daily_limit - self.used() - self.in_flight, 0)
+
+    def can_admit(self, resource: str, priority: str = PRIORITY_NORMAL) -> bool:
+        """Whether a call would leave at least the priority's reserve unspent."""
+        return self.remaining() - self.cost(resource) >= self.reserves.get(priority, 0)
+
+    def admit(self, resource: str, priority: str = PRIORITY_NORMAL) -> None:
+        """Admit a call and reserve its units, or raise QuotaExceededError.
+
+        Every admitted call must be followed by ``charge`` or ``refund``.
+        """
+        if not self.can_admit(resource, priority):
+            self.shed[priority] = self.shed.get(priority, 0) + 1
+            raise QuotaExceededError(
+                f"YouTube API quota too low for {priority}-priority {resource} call "
+                f"({self.remaining()} of {self.daily_limit} units left)"
+            )
+        self.admitted[priority] = self.admitted.get(priority, 0) + 1
+        self.in_flight += self.cost(resource)
+
+    def refund(self, resource: str) -> None:
+        """Release the units an admitted call reserved without charging them."""
+        self.in_flight -= self.cost(resource)
+
+    def charge(self, resource: str, units: Optional[int] = None) -> None:
+        """Record an admitted call against today's quota."""
+        self.in_flight -= self.cost(resource)
+        units = self.cost(resource) if units is None else units
+        today = self._today()
+        today['total'] += units
+        today['calls'] += 1
+        today[resource] = today.get(resource, 0) + units
+        # Persist at most every few seconds; a crash loses little accounting
+        if self.state_path and time.monotonic() - self._last_saved > 5:
+            self._schedule_save()
+
+    def _schedule_save(self) -> None:
+        """Write the totals in a worker thread, unless a write is already running."""
+        if self._pending_save is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        self._last_saved = time.monotonic()
+        days = {day: dict(totals) for day, totals in self.days.items()}
+        self._pending_save = loop.run_in_executor(None, self._write, days)
+        self._pending_save.add_done_callback(self._save_done)
+
+    def _save_done(self, future: asyncio.Future) -> None:
+        self._pending_save = None
+
+    async def flush(self) -> None:
+        """Wait for a background write to finish."""
+        if self._pending_save is not None:
+            await asyncio.shield(self._pending_save)
+
+    def _load(self) -> None:
+        if not self.state_path or not self.state_path.exists():
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                days = json.load(f)
+            for day in sorted(days)[-self.history_days:]:
+                self.days[day] = days[day]
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load quota ledger from {self.state_path}: {str(e)}")
+
+    def save(self) -> None:
+        """Write the daily totals to disk."""
+        if not self.state_path:
+            return
+        self._last_saved = time.monotonic()
+        self._write(self.days)
+
+    def _write(self, days: Dict[str, Dict[str, int]]) -> None:
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(days, f)
+            tmp_path.replace(self.state_path)
+        except OSError as e:
+            logger.warning(f"Could not save quota ledger to {self.state_path}: {str(e)}")
+
+    def stats(self) -> Dict:
+        today = dict(self._today())
+        return {
+            'quota_day': self._quota_day(),
+            'daily_limit': self.daily_limit,
+            'used': today.pop('total'),
+            'remaining': self.remaining(),
+            'in_flight': self.in_flight,
+            'calls': today.pop('calls'),
+            'by_resource': today,
+            'reserves': dict(self.reserves),
+            'admitted': dict(self.admitted),
+            'shed': dict(self.shed),
+            'history': {day: totals['total'] for day, totals in self.days.items()},
+        }
@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight fetch.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task and receive the same result or exception.
+    Nothing is cached once the task finishes.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn`` for ``key`` unless an identical call is already in flight."""
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        # Shield so one cancelled caller does not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    def stats(self) -> Dict:
+        return {
+            'calls': self.calls,
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'in_flight': len(self._in_flight),
+        }
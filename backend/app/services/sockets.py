@@ -0,0 +1,89 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+from starlette.websockets import WebSocket
+
+logger = logging.getLogger(__name__)
+
+# Close codes
+CLOSE_GOING_AWAY = 1001
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TRY_AGAIN_LATER = 1013
+# Application-defined: the client must rebuild the conversation before reconnecting
+CLOSE_RESYNC_REQUIRED = 4409
+
+
+class SocketRegistry:
+    """Admission control and heartbeats for long-lived WebSockets.
+
+    At most ``max_connections`` sockets are open at once; further ones are
+    closed straight after the handshake. While a socket is idle the server
+    sends a ``ping`` event every ``heartbeat_seconds`` and closes it once
+    nothing has been received from the client for ``idle_timeout_seconds``,
+    so abandoned connections do not hold a slot.
+    """
+
+    def __init__(self, max_connections: int, heartbeat_seconds: float, idle_timeout_seconds: float):
+        self.max_connections = max_connections
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.active = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.heartbeats = 0
+        self.idle_closed = 0
+
+    def acquire(self) -> bool:
+        """Claim a slot for a new socket; False if the limit is reached."""
+        if self.active >= self.max_connections:
+            self.rejected += 1
+            return False
+        self.active += 1
+        self.accepted += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+
+    async def receive(self, websocket: WebSocket) -> Optional[Dict]:
+        """Wait for the client's next JSON message, sending heartbeats meanwhile.
+
+        Returns:
+            The decoded message, or None if the socket was closed for being idle
+
+        Raises:
+            WebSocketDisconnect: If the client disconnected
+            ValueError: If the message is not a JSON object
+        """
+        last_seen = time.monotonic()
+        while True:
+            try:
+                text = await asyncio.wait_for(websocket.receive_text(), timeout=self.heartbeat_seconds)
+            except asyncio.TimeoutError:
+                if time.monotonic() - last_seen >= self.idle_timeout_seconds:
+                    self.idle_closed += 1
+                    await websocket.close(code=CLOSE_GOING_AWAY)
+                    return None
+                self.heartbeats += 1
+                await websocket.send_json({'event': 'ping'})
+                continue
+            last_seen = time.monotonic()
+            message = json.loads(text)
+            if not isinstance(message, dict):
+                raise ValueError("Expected a JSON object")
+            if message.get('type') == 'pong':
+                continue
+            return message
+
+    def stats(self) -> Dict:
+        return {
+            'active': self.active,
+            'max_connections': self.max_connections,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'heartbeats': self.heartbeats,
+            'idle_closed': self.idle_closed,
+        }
@@ -0,0 +1,116 @@
+"""
+Token counting with tiktoken encoders resolved once per model.
+
+tiktoken downloads its BPE files on first use. Point ``TIKTOKEN_CACHE_DIR``
+at a directory shipped with the app and populate it at build time::
+
+    python -m app.services.tokenizer
+
+so that nodes without internet access load encoders from disk.
+"""
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import tiktoken
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Used for model names tiktoken does not know (new or fine-tuned models)
+DEFAULT_ENCODING = "cl100k_base"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for when no encoder is available"""
+    return len(text) // 4
+
+
+class TokenCounter:
+    """Count tokens with one cached encoder per model.
+
+    Encoders are only loaded by :meth:`preload`, normally from a worker
+    thread at startup. Until a model's encoder is loaded (or if loading
+    failed) counts fall back to an estimate and are flagged as such, so a
+    request never waits on a tiktoken download.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        if cache_dir:
+            # tiktoken reads the cache location from the environment
+            os.environ["TIKTOKEN_CACHE_DIR"] = cache_dir
+        self._encoders: Dict[str, tiktoken.Encoding] = {}
+        self._lock = threading.Lock()
+        self.load_errors: Dict[str, str] = {}
+        self.exact_counts = 0
+        self.estimated_counts = 0
+
+    def preload(self, models: Iterable[str]) -> None:
+        """Resolve and load the encoder for each model (blocking)."""
+        for model in models:
+            self._load(model)
+
+    def _load(self, model: str) -> Optional[tiktoken.Encoding]:
+        with self._lock:
+            if model in self._encoders:
+                return self._encoders[model]
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+            except Exception as e:
+                self.load_errors[model] = str(e)
+                logger.warning(
+                    f"Could not load tiktoken encoder for {model} "
+                    f"(cache dir {self.cache_dir or 'default'}); token counts will be estimates: {str(e)}"
+                )
+                return None
+            self._encoders[model] = encoding
+            self.load_errors.pop(model, None)
+            logger.info(f"Loaded tiktoken encoding {encoding.name} for {model}")
+            return encoding
+
+    def is_loaded(self, model: str) -> bool:
+        return model in self._encoders
+
+    def count(self, text: str, model: str) -> Tuple[int, bool]:
+        """Return ``(tokens, estimated)`` for one text."""
+        return self.count_many([text], model)[0]
+
+    def count_many(self, texts: List[str], model: str) -> List[Tuple[int, bool]]:
+        """Count tokens for several texts with one batch encode.
+
+        Returns:
+            ``(tokens, estimated)`` per text, in order; ``estimated`` is True
+            when no encoder was available and the count is a heuristic
+        """
+        encoding = self._encoders.get(model)
+        if encoding is None:
+            self.estimated_counts += len(texts)
+            return [(estimate_tokens(text), True) for text in texts]
+        # Special-token markers in user text are counted as ordinary text
+        encoded = encoding.encode_ordinary_batch(texts)
+        self.exact_counts += len(texts)
+        return [(len(tokens), False) for tokens in encoded]
+
+    def stats(self) -> Dict:
+        return {
+            'cache_dir': self.cache_dir,
+            'loaded': {model: encoding.name for model, encoding in self._encoders.items()},
+            'load_errors': dict(self.load_errors),
+            'exact_counts': self.exact_counts,
+            'estimated_counts': self.estimated_counts,
+        }
+
+
+if __name__ == "__main__":
+    # Populate TIKTOKEN_CACHE_DIR for the configured model (run at build time)
+    logging.basicConfig(level=logging.INFO)
+    counter = TokenCounter(settings.TIKTOKEN_CACHE_DIR)
+    counter.preload([settings.OPENAI_MODEL])
+    if counter.load_errors:
+        raise SystemExit(1)
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (video_id, language_code, is_generated)
+TranscriptKey = Tuple[str, str, bool]
+
+DATA_FILE = "segments.dat"
+INDEX_FILE = "index.tsv"
+DICT_FILE = "dict-{}.bin"
+
+# zlib only looks back 32 KiB, so a larger preset dictionary is wasted
+MAX_DICT_BYTES = 32 * 1024
+
+
+class TranscriptStore:
+    """Append-only on-disk store of transcript segments.
+
+    Each entry is the segment list (start, duration, text) for one
+    ``(video_id, language, is_generated)`` key, serialised as compact JSON and
+    zlib-compressed with a preset dictionary trained on stored transcripts.
+
+    ``segments.dat`` holds the compressed blobs back to back. ``index.tsv`` has
+    one line per entry (key, offset, length, dictionary id) and is the only
+    thing loaded into memory, so a lookup is a dict hit plus one seek and read.
+
+    All methods are synchronous and thread-safe; call them from the transcript
+    executor rather than the event loop.
+    """
+
+    def __init__(self, directory: str, train_after: int = 200):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.directory / DATA_FILE
+        self.index_path = self.directory / INDEX_FILE
+        self.train_after = train_after
+        self._lock = threading.Lock()
+
+        self._index: Dict[TranscriptKey, Tuple[int, int, int]] = {}
+        self._by_video: Dict[str, List[TranscriptKey]] = {}
+        self._dictionaries: Dict[int, bytes] = {0: b""}
+        self.dict_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.raw_bytes = 0
+        self.written_bytes = 0
+        self.stored_bytes = 0
+
+        self._load()
+
+    def _load(self) -> None:
+        for path in self.directory.glob(DICT_FILE.format("*")):
+            dict_id = int(path.stem.split("-", 1)[1])
+            self._dictionaries[dict_id] = path.read_bytes()
+        self.dict_id = max(self._dictionaries)
+
+        if not self.index_path.exists():
+            return
+        data_size = self.data_path.stat().st_size if self.data_path.exists() else 0
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 6:
+                    continue
+                video_id, language, generated, offset, length, dict_id = parts
+                offset, length = int(offset), int(length)
+                if offset + length > data_size or int(dict_id) not in self._dictionaries:
+                    # Torn write from a crash; the data never made it to disk
+                    continue
+                self._add_to_index((video_id, language, generated == "1"), offset, length, int(dict_id))
+        logger.info(f"Transcript store loaded {len(self._index)} entries from {self.directory}")
+
+    def _add_to_index(self, key: TranscriptKey, offset: int, length: int, dict_id: int) -> None:
+        if key not in self._index:
+            self._by_video.setdefault(key[0], []).append(key)
+        self._index[key] = (offset, length, dict_id)
+        self.stored_bytes += length
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: TranscriptKey) -> bool:
+        return key in self._index
+
+    def get(self, video_id: str, language: str, is_generated: bool) -> Optional[List[Dict]]:
+        """Return the stored segments for an exact key, or None."""
+        with self._lock:
+            segments = self._read((video_id, language, is_generated))
+            if segments is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return segments
+
+    def find(self, video_id: str, languages: Iterable[str] = ("en",)) -> Optional[Tuple[TranscriptKey, List[Dict]]]:
+        """Return the best stored transcript for a video.
+
+        Mirrors ``TranscriptList.find_transcript``: manual transcripts in the
+        preferred languages first, then generated ones, then anything stored.
+        """
+        with self._lock:
+            keys = self._by_video.get(video_id)
+            if not keys:
+                self.misses += 1
+                return None
+            candidates = [(video_id, lang, generated) for generated in (False, True) for lang in languages]
+            key = next((k for k in candidates if k in self._index), None)
+            if key is None:
+                key = sorted(keys, key=lambda k: k[2])[0]
+            self.hits += 1
+            return key, self._read(key)
+
+    def put(self, video_id: str, language: str, is_generated: bool, segments: List[Dict]) -> None:
+        """Compress and append a transcript; existing keys are left untouched."""
+        key = (video_id, language, is_generated)
+        payload = json.dumps(
+            [[round(s.get("start", 0.0), 2), round(s.get("duration", 0.0), 2), s.get("text", "")] for s in segments],
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+
+        with self._lock:
+            if key in self._index:
+                return
+            blob = self._compress(payload, self.dict_id)
+            with open(self.data_path, "ab") as data_file:
+                offset = data_file.tell()
+                data_file.write(blob)
+                data_file.flush()
+                os.fsync(data_file.fileno())
+            with open(self.index_path, "a", encoding="utf-8") as index_file:
+                index_file.write(
+                    f"{video_id}\t{language}\t{int(is_generated)}\t{offset}\t{len(blob)}\t{self.dict_id}\n"
+                )
+            self._add_to_index(key, offset, len(blob), self.dict_id)
+            self.writes += 1
+            self.raw_bytes += len(payload)
+            self.written_bytes += len(blob)
+
+            if self.dict_id == 0 and len(self._index) >= self.train_after:
+                self._train_locked()
+
+    def _read(self, key: TranscriptKey) -> Optional[List[Dict]]:
+        location = self._index.get(key)
+        if location is None:
+            return None
+        offset, length, dict_id = location
+        with open(self.data_path, "rb") as data_file:
+            data_file.seek(offset)
+            blob = data_file.read(length)
+        rows = json.loads(self._decompress(blob, dict_id))
+        return [{"start": start, "duration": duration, "text": text} for start, duration, text in rows]
+
+    def _compress(self, payload: bytes, dict_id: int) -> bytes:
+        zdict = self._dictionaries[dict_id]
+        compressor = zlib.compressobj(level=9, zdict=zdict) if zdict else zlib.compressobj(level=9)
+        return compressor.compress(payload) + compressor.flush()
+
+    def _decompress(self, blob: bytes, dict_id: int) -> bytes:
+        zdict = self._dictionaries[dict_id]
+        decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+        return decompressor.decompress(blob) + decompressor.flush()
+
+    def train_dictionary(self, sample_size: int = 500) -> int:
+        """Build a new preset dictionary from stored transcripts.
+
+        Only entries written afterwards use it; older entries keep the
+        dictionary they were compressed with. Returns the new dictionary id.
+        """
+        with self._lock:
+            return self._train_locked(sample_size)
+
+    def _train_locked(self, sample_size: int = 500) -> int:
+        texts = []
+        for key in list(self._index)[-sample_size:]:
+            texts.extend(segment["text"] for segment in self._read(key))
+        zdict = build_dictionary(texts)
+        if not zdict:
+            return self.dict_id
+
+        dict_id = self.dict_id + 1
+        (self.directory / DICT_FILE.format(dict_id)).write_bytes(zdict)
+        self._dictionaries[dict_id] = zdict
+        self.dict_id = dict_id
+        logger.info(f"Trained transcript dictionary {dict_id} ({len(zdict)} bytes) from {len(texts)} segments")
+        return dict_id
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._index),
+            "videos": len(self._by_video),
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "dictionary_id": self.dict_id,
+            "stored_bytes": self.stored_bytes,
+            "compression_ratio": round(self.raw_bytes / self.written_bytes, 2) if self.written_bytes else None,
+        }
+
+
+def build_dictionary(texts: List[str], max_bytes: int = MAX_DICT_BYTES) -> bytes:
+    """Pick the most valuable recurring phrases for a zlib preset dictionary.
+
+    Phrases of one to three words are scored by how many bytes they would save
+    (occurrences times length). zlib favours matches closer to the end of the
+    dictionary, so the best phrases are placed last.
+    """
+    counts: Counter = Counter()
+    for text in texts:
+        words = text.split()
+        for n in (1, 2, 3):
+            for i in range(len(words) - n + 1):
+                counts[" ".join(words[i:i + n])] += 1
+
+    scored = sorted(
+        ((count * len(phrase), phrase) for phrase, count in counts.items() if count > 1 and len(phrase) > 3),
+        reverse=True
+    )
+    # Segment framing from the JSON payload is the most common string of all
+    chosen = ['"],[', ',"']
+    size = sum(len(p) for p in chosen)
+    for _, phrase in scored:
+        encoded_len = len(phrase.encode("utf-8")) + 1
+        if size + encoded_len > max_bytes:
+            break
+        chosen.append(phrase)
+        size += encoded_len
+    if len(chosen) <= 2:
+        return b""
+    return " ".join(reversed(chosen)).encode("utf-8")
@@ -1,48 +1,324 @@
 import os
-from typing import Dict, List, Optional
+import re
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Union
 import httpx
 from youtubesearchpython import ChannelsSearch, Video
 from youtube_transcript_api import YouTubeTranscriptApi
 from ..config import settings
+from .http_client import PooledHTTPClient
+from .transcript_store import TranscriptStore
+from .cache import TTLCache
+from .singleflight import SingleFlight
+from .quota import QuotaLedger, QuotaExceededError, PRIORITY_NORMAL
+from .handle_map import HandleMap
+from .pipeline import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# Partial-response projections: each call asks only for the keys it reads
+CHANNEL_FIELDS = (
+    "items(id,snippet(title,description,thumbnails/high/url),"
+    "statistics(subscriberCount,videoCount,viewCount),"
+    "contentDetails/relatedPlaylists/uploads)"
+)
+PLAYLIST_ITEM_FIELDS = (
+    "nextPageToken,"
+    "items(snippet(title,description,publishedAt,thumbnails/high/url),"
+    "contentDetails(videoId,videoPublishedAt))"
+)
+VIDEO_FIELDS = "items(id,contentDetails(duration,caption),statistics/viewCount)"
+
+ISO_DURATION = re.compile(r'P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?')
+
+
+def is_channel_id(identifier: str) -> bool:
+    """Channel IDs are 'UC' plus 22 characters; shorter UC... names are handles."""
+    return identifier.startswith('UC') and len(identifier) == 24
+
 
 class YouTubeService:
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        http_client: PooledHTTPClient = None,
+        transcript_store: Optional[TranscriptStore] = None,
+        quota: Optional[QuotaLedger] = None,
+        handle_map: Optional[HandleMap] = None
+    ):
         self.base_url = "https://www.googleapis.com/youtube/v3"
         self.api_key = api_key or settings.YOUTUBE_API_KEY
+        self.http_client = http_client or PooledHTTPClient()
+        self.transcript_store = transcript_store
+        self.quota = quota or QuotaLedger(settings.YOUTUBE_DAILY_QUOTA)
+        self.handle_map = handle_map or HandleMap(
+            None, settings.HANDLE_MAP_TTL_SECONDS, settings.HANDLE_NEGATIVE_TTL_SECONDS
+        )
+        
+        # The transcript scraper is synchronous, so it runs in its own bounded
+        # thread pool instead of blocking the event loop
+        self._transcript_executor = ThreadPoolExecutor(
+            max_workers=settings.TRANSCRIPT_WORKERS,
+            thread_name_prefix="transcripts"
+        )
+        self._transcript_semaphore = asyncio.Semaphore(settings.TRANSCRIPT_MAX_CONCURRENCY)
+        self.transcript_timeout = settings.TRANSCRIPT_TIMEOUT_SECONDS
+        self.transcripts_fetched = 0
+        self.transcript_errors = 0
+        self.transcript_timeouts = 0
+        self.transcripts_in_flight = 0
+        
+        # Channel search scrapes youtube.com synchronously as well
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=settings.SEARCH_WORKERS,
+            thread_name_prefix="search"
+        )
+        self.search_cache = TTLCache(
+            max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+            max_bytes=settings.SEARCH_CACHE_MAX_BYTES,
+            ttl=settings.SEARCH_CACHE_TTL_SECONDS
+        )
+        self.search_flights = SingleFlight()
+        
+        # Data API bodies kept with their ETags for conditional refreshes
+        self.etag_cache = TTLCache(
+            max_entries=settings.ETAG_CACHE_MAX_ENTRIES,
+            max_bytes=settings.ETAG_CACHE_MAX_BYTES,
+            ttl=settings.ETAG_CACHE_TTL_SECONDS
+        )
+        self.not_modified = 0
+        self.bytes_saved = 0
+        self.quota_saved = 0
+        self.stale_served = 0
+        
+        self._enrich_semaphore = asyncio.Semaphore(settings.ENRICH_MAX_CONCURRENT_BATCHES)
+        
+        # Response bytes and JSON parse time per Data API endpoint
+        self.payload_stats: Dict[str, Dict] = {}
+        
+    def close(self) -> None:
+        """Stop the transcript and search worker threads."""
+        self._transcript_executor.shutdown(wait=False, cancel_futures=True)
+        self._search_executor.shutdown(wait=False, cancel_futures=True)
+        
+    def stats(self) -> Dict:
+        """Return transcript and search counters."""
+        return {
+            'transcripts_fetched': self.transcripts_fetched,
+            'transcript_errors': self.transcript_errors,
+            'transcript_timeouts': self.transcript_timeouts,
+            'transcripts_in_flight': self.transcripts_in_flight,
+            'transcript_store': self.transcript_store.stats() if self.transcript_store else None,
+            'search_cache': self.search_cache.stats(),
+            'search_flights': self.search_flights.stats(),
+            'handle_map': self.handle_map.stats(),
+            'payloads': {
+                resource: {
+                    'responses': payload['responses'],
+                    'bytes': payload['bytes'],
+                    'avg_bytes': payload['bytes'] // payload['responses'],
+                    'avg_parse_ms': round(payload['parse_ms'] / payload['responses'], 3),
+                }
+                for resource, payload in self.payload_stats.items()
+            },
+            'conditional_requests': {
+                'etag_cache': self.etag_cache.stats(),
+                'not_modified': self.not_modified,
+                'bytes_saved': self.bytes_saved,
+                'quota_saved': self.quota_saved,
+                'stale_served': self.stale_served,
+            },
+        }
+        
+    async def _api_get(self, resource: str, params: Dict, priority: str = PRIORITY_NORMAL) -> Dict:
+        """Call a YouTube Data API resource through the shared connection pool.
+        
+        The call is admitted against the daily quota ledger, which holds its
+        units until it is charged, or refunded if it never reached the API or
+        came back as a free 304. If it is shed, the last cached body is served instead, or QuotaExceededError
+        is raised when there is none. Bodies are kept with their
+        ETag, and repeat calls send If-None-Match so an unchanged resource
+        comes back as a cheap 304 that renews the cached body.
+        """
+        cache_key = (resource, tuple(sorted(params.items())))
+        cached = self.etag_cache.get(cache_key)
+        headers = {'If-None-Match': cached['etag']} if cached else {}
+        
+        try:
+            self.quota.admit(resource, priority)
+        except QuotaExceededError:
+            if not cached:
+                raise
+            # Short on quota: a possibly stale copy beats failing the call
+            self.stale_served += 1
+            return cached['body']
+        try:
+            response = await self.http_client.get(
+                f"{self.base_url}/{resource}",
+                params={**params, 'key': self.api_key},
+                headers=headers
+            )
+        except BaseException:
+            self.quota.refund(resource)
+            raise
+        
+        if response.status_code == 304 and cached:
+            self.quota.refund(resource)
+            self.not_modified += 1
+            self.bytes_saved += cached['size']
+            self.quota_saved += self.quota.cost(resource)
+            self.etag_cache.set(cache_key, cached)
+            return cached['body']
+        
+        # Any other request that reaches the API is billed, including errors
+        self.quota.charge(resource)
+        response.raise_for_status()
+        parse_start = time.perf_counter()
+        body = response.json()
+        self._record_payload(resource, len(response.content), (time.perf_counter() - parse_start) * 1000)
+        
+        etag = response.headers.get('ETag')
+        if etag:
+            self.etag_cache.set(cache_key, {'etag': etag, 'body': body, 'size': len(response.content)})
+        return body
+        
+    def _record_payload(self, resource: str, size: int, parse_ms: float) -> None:
+        """Accumulate response size and JSON parse time per endpoint."""
+        payload = self.payload_stats.setdefault(resource, {'responses': 0, 'bytes': 0, 'parse_ms': 0.0})
+        payload['responses'] += 1
+        payload['bytes'] += size
+        payload['parse_ms'] += parse_ms
         
-    async def search_channel(self, query: str, max_results: int = 5) -> List[Dict]:
-        """Search for YouTube channels by name or URL"""
+    async def search_channels(self, query: str, max_results: int = 5) -> List[Dict]:
+        """Search for YouTube channels by name or URL
+        
+        Results are cached per normalised query, and identical searches that
+        arrive while one is running share its result.
+        """
         if not self.api_key:
             raise ValueError("YouTube API key is not configured")
             
-        try:
-            # First try to search using the query directly
-            channels_search = ChannelsSearch(query, limit=max_results)
-            results = channels_search.result()
-            
-            # Format the results
-            channels = []
-            for item in results.get('result', [])[:max_results]:
-                channel = {
-                    'id': item.get('id', ''),
-                    'title': item.get('title', ''),
-                    'description': item.get('description', ''),
-                    'thumbnail': item.get('thumbnails', [{}])[0].get('url', '') if item.get('thumbnails') else '',
-                    'subscriber_count': item.get('subscribers', ''),
-                    'video_count': item.get('videos', 0)
-                }
-                channels.append(channel)
-                
+        cache_key = (self._normalise_query(query), max_results)
+        if not cache_key[0]:
+            return []
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        async def run_search() -> List[Dict]:
+            loop = asyncio.get_running_loop()
+            channels = await loop.run_in_executor(
+                self._search_executor, self._search_channels, query, max_results
+            )
+            self.search_cache.set(cache_key, channels)
             return channels
-            
+        
+        try:
+            return await self.search_flights.do(cache_key, run_search)
         except Exception as e:
             raise Exception(f"Error searching for channels: {str(e)}")
     
-    async def get_channel_info(self, channel_identifier: str) -> Dict:
+    def _normalise_query(self, query: str) -> str:
+        """Case-fold and collapse whitespace so equivalent queries share a cache entry"""
+        return " ".join(query.lower().split())
+    
+    def _search_channels(self, query: str, max_results: int) -> List[Dict]:
+        """Blocking channel search; only call from the search executor."""
+        # First try to search using the query directly
+        channels_search = ChannelsSearch(query, limit=max_results)
+        results = channels_search.result()
+        
+        # Format the results
+        channels = []
+        for item in results.get('result', [])[:max_results]:
+            thumbnail = item.get('thumbnails', [{}])[0].get('url', '') if item.get('thumbnails') else ''
+            if thumbnail.startswith('//'):
+                thumbnail = 'https:' + thumbnail
+            channel = {
+                'id': item.get('id') or '',
+                'title': item.get('title') or '',
+                'description': "".join(run.get('text', '') for run in item.get('descriptionSnippet') or []),
+                'thumbnail': thumbnail,
+                'subscriber_count': item.get('subscribers') or '',
+                'video_count': item.get('videoCount') or '0'
+            }
+            channels.append(channel)
+            
+        return channels
+    
+    async def get_channel_info(
+        self,
+        channel_identifier: str,
+        priority: str = PRIORITY_NORMAL,
+        timer: Optional[StageTimer] = None
+    ) -> Dict:
         """Get detailed information about a YouTube channel.
         
+        Runs as a small dependency graph rather than a chain: when the channel
+        ID is already known (a UC... ID or a resolved handle) the uploads page
+        is requested alongside the channel details rather than after them.
+        
         Args:
             channel_identifier: Can be a channel ID (starts with UC) or a handle (with or without @)
+            priority: Quota admission priority for the underlying API calls
+            timer: Records the ``channel`` and ``uploads`` stages
+        """
+        timer = timer or StageTimer()
+        known_id = self.known_channel_id(channel_identifier)
+        details_task = timer.start('channel', self.get_channel_details(channel_identifier, priority))
+        uploads_task = None
+        if known_id and self.api_key:
+            uploads_task = timer.start('uploads', self.get_channel_videos(
+                self.uploads_playlist_id(known_id), max_results=10, priority=priority
+            ))
+        try:
+            channel_info = await details_task
+            uploads_playlist_id = channel_info.pop('uploads_playlist_id')
+            if uploads_task is None or uploads_playlist_id != self.uploads_playlist_id(known_id):
+                if uploads_task is not None:
+                    self._discard(uploads_task)
+                uploads_task = timer.start('uploads', self.get_channel_videos(
+                    uploads_playlist_id, max_results=10, priority=priority
+                ) if uploads_playlist_id else asyncio.sleep(0, result=[]), after=['channel'])
+            channel_info['videos'] = await uploads_task
+        finally:
+            for task in (details_task, uploads_task):
+                if task is not None:
+                    self._discard(task)
+        return channel_info
+    
+    @staticmethod
+    def _discard(task: asyncio.Task) -> None:
+        """Cancel a task whose result is no longer needed."""
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()  # Mark a discarded failure as retrieved
+    
+    def known_channel_id(self, channel_identifier: str) -> Optional[str]:
+        """Return the channel ID for an identifier if it is known without an API call."""
+        identifier = channel_identifier.strip().lstrip('@')
+        if is_channel_id(identifier):
+            return identifier
+        known, channel_id = self.handle_map.lookup(identifier)
+        return channel_id if known else None
+    
+    @staticmethod
+    def uploads_playlist_id(channel_id: str) -> str:
+        """A channel's uploads playlist ID is its channel ID with UC replaced by UU."""
+        return 'UU' + channel_id[2:]
+    
+    async def get_channel_details(self, channel_identifier: str, priority: str = PRIORITY_NORMAL) -> Dict:
+        """Get a channel's metadata and uploads playlist ID, without its videos.
+        
+        Args:
+            channel_identifier: Can be a channel ID (starts with UC) or a handle (with or without @)
+            priority: Quota admission priority for the underlying API calls
         """
         if not self.api_key:
             raise ValueError("YouTube API key is not configured")
@@ -54,135 +330,306 @@ class YouTubeService:
             raise ValueError("Channel identifier cannot be empty")
 
         try:
-            async with httpx.AsyncClient() as client:
-                if identifier.startswith('UC'):
-                    channel_id = identifier
-                else:
-                    channel_id = await self._resolve_channel_id_from_handle(client, identifier)
-
-                params = {
-                    'part': 'snippet,statistics,contentDetails',
-                    'id': channel_id,
-                    'key': self.api_key
-                }
-                response = await client.get(
-                    f"{self.base_url}/channels",
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                if not data.get('items'):
-                    raise ValueError("Channel not found")
+            if is_channel_id(identifier):
+                channel_data = await self._fetch_channel({'id': identifier}, priority)
+            else:
+                channel_data = await self._fetch_channel_by_handle(identifier, priority)
 
-                channel_data = data['items'][0]
-                snippet = channel_data.get('snippet', {})
-                stats = channel_data.get('statistics', {})
+            if not channel_data:
+                raise ValueError("Channel not found")
 
-                uploads_playlist_id = channel_data.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
-                videos = []
-                if uploads_playlist_id:
-                    videos = await self.get_channel_videos(uploads_playlist_id, max_results=10)
+            snippet = channel_data.get('snippet', {})
+            stats = channel_data.get('statistics', {})
 
-                return {
-                    'id': channel_data.get('id', ''),
-                    'title': snippet.get('title', ''),
-                    'description': snippet.get('description', ''),
-                    'thumbnail': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
-                    'subscriber_count': stats.get('subscriberCount', '0'),
-                    'video_count': stats.get('videoCount', '0'),
-                    'view_count': stats.get('viewCount', '0'),
-                    'videos': videos
-                }
+            return {
+                'id': channel_data.get('id', ''),
+                'title': snippet.get('title', ''),
+                'description': snippet.get('description', ''),
+                'thumbnail': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
+                'subscriber_count': stats.get('subscriberCount', '0'),
+                'video_count': stats.get('videoCount', '0'),
+                'view_count': stats.get('viewCount', '0'),
+                'uploads_playlist_id': channel_data.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
+            }
 
         except httpx.HTTPStatusError as e:
             error_msg = f"YouTube API error: {str(e)}"
             if e.response and e.response.status_code == 404:
                 error_msg = f"Channel '{identifier}' not found"
             raise ValueError(error_msg)
-        except ValueError:
+        except (ValueError, QuotaExceededError):
             raise
         except Exception as e:
             raise Exception(f"Error getting channel info: {str(e)}")
 
-    async def _resolve_channel_id_from_handle(self, client: httpx.AsyncClient, handle: str) -> str:
-        """Resolve a YouTube channel ID using a handle or query."""
-        search_params = {
-            'part': 'snippet',
-            'q': handle,
-            'type': 'channel',
-            'maxResults': 1,
-            'key': self.api_key
-        }
-        search_url = f"{self.base_url}/search"
-        search_response = await client.get(search_url, params=search_params)
-        search_response.raise_for_status()
-        search_data = search_response.json()
+    async def _fetch_channel(self, selector: Dict, priority: str = PRIORITY_NORMAL) -> Optional[Dict]:
+        """Fetch one channel resource selected by ``id`` or ``forHandle``."""
+        data = await self._api_get('channels', {
+            'part': 'snippet,statistics,contentDetails',
+            'fields': CHANNEL_FIELDS,
+            **selector
+        }, priority)
+        items = data.get('items') or []
+        return items[0] if items else None
 
-        items = search_data.get('items') or []
-        if not items:
-            raise ValueError(f"Channel '{handle}' not found")
+    async def _fetch_channel_by_handle(self, handle: str, priority: str = PRIORITY_NORMAL) -> Optional[Dict]:
+        """Resolve a handle and fetch its channel in a single channels.list call.
+        
+        A known handle is fetched by ID; an unknown one uses the 1-unit
+        ``forHandle`` lookup, which returns the channel itself, and the result
+        (including "no such handle") is remembered in the handle map.
+        """
+        known, channel_id = self.handle_map.lookup(handle)
+        if known:
+            if channel_id is None:
+                raise ValueError(f"Channel '{handle}' not found")
+            return await self._fetch_channel({'id': channel_id}, priority)
 
-        channel_id = items[0].get('id', {}).get('channelId')
-        if not channel_id:
+        channel_data = await self._fetch_channel({'forHandle': f"@{handle}"}, priority)
+        self.handle_map.set(handle, channel_data.get('id') if channel_data else None)
+        if not channel_data:
             raise ValueError(f"Channel '{handle}' not found")
-
-        return channel_id
+        return channel_data
     
-    async def get_channel_videos(self, playlist_id: str, max_results: int = 10) -> List[Dict]:
-        """Get videos from a channel's uploads playlist"""
+    async def get_channel_videos(
+        self,
+        playlist_id: str,
+        max_results: int = 10,
+        priority: str = PRIORITY_NORMAL,
+        since_video_id: Optional[str] = None,
+        since_published_at: Optional[str] = None
+    ) -> List[Dict]:
+        """Get videos from a channel's uploads playlist
+        
+        With ``since_video_id``/``since_published_at`` (the newest upload seen
+        last time) only videos uploaded after it are returned, which usually
+        takes a single page request.
+        """
         if not self.api_key:
             raise ValueError("YouTube API key is not configured")
             
         try:
-            async with httpx.AsyncClient() as client:
-                # Get playlist items
-                url = f"{self.base_url}/playlistItems"
-                params = {
-                    'part': 'snippet,contentDetails',
-                    'playlistId': playlist_id,
-                    'maxResults': max_results,
-                    'key': self.api_key
-                }
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                videos = []
-                for item in data.get('items', []):
-                    video_id = item.get('contentDetails', {}).get('videoId')
-                    if not video_id:
-                        continue
-                        
-                    snippet = item.get('snippet', {})
-                    videos.append({
-                        'id': video_id,
-                        'title': snippet.get('title', ''),
-                        'description': snippet.get('description', ''),
-                        'published_at': snippet.get('publishedAt', ''),
-                        'thumbnail': snippet.get('thumbnails', {}).get('high', {}).get('url', '')
-                    })
-                
-                return videos
+            videos = []
+            async with aclosing(self.iter_channel_uploads(
+                playlist_id,
+                max_videos=max_results,
+                published_after=since_published_at or None,
+                stop_at_video_id=since_video_id,
+                priority=priority
+            )) as uploads:
+                async for video in uploads:
+                    videos.append(video)
+            return videos
                 
+        except QuotaExceededError:
+            raise
         except Exception as e:
             print(f"Error getting channel videos: {str(e)}")
             return []
     
-    async def get_video_transcript(self, video_id: str) -> str:
-        """Get transcript for a YouTube video."""
+    async def iter_channel_uploads(
+        self,
+        playlist_id: str,
+        max_videos: Optional[int] = None,
+        published_after: Optional[Union[datetime, str]] = None,
+        page_size: int = 50,
+        priority: str = PRIORITY_NORMAL,
+        stop_at_video_id: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """Stream videos from an uploads playlist, newest first.
+        
+        Pages are fetched on demand: the next page is requested while the
+        caller consumes the current one, and crawling stops as soon as
+        ``max_videos`` have been yielded, ``stop_at_video_id`` is reached or
+        a video older than ``published_after`` is reached. Wrap in
+        ``contextlib.aclosing`` when breaking out early so the pending
+        prefetch is cancelled promptly.
+        
+        Args:
+            playlist_id: The channel's uploads playlist (UU...)
+            max_videos: Stop after this many videos
+            published_after: Stop at the first video published at or before this time
+            page_size: playlistItems page size (the API allows at most 50)
+            priority: Quota admission priority for the page requests
+            stop_at_video_id: Stop (exclusive) at this video, e.g. the newest
+                one already known
+        """
+        if isinstance(published_after, str):
+            published_after = self._parse_timestamp(published_after)
+        page_size = max(1, min(page_size, 50))
+        
+        def fetch_page(page_token: Optional[str], wanted: Optional[int]):
+            params = {
+                'part': 'snippet,contentDetails',
+                'fields': PLAYLIST_ITEM_FIELDS,
+                'playlistId': playlist_id,
+                'maxResults': min(page_size, wanted) if wanted else page_size
+            }
+            if page_token:
+                params['pageToken'] = page_token
+            return asyncio.ensure_future(self._api_get('playlistItems', params, priority))
+        
+        delivered = 0
+        pending = fetch_page(None, max_videos)
         try:
-            transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-            # Try to get the English transcript, fallback to the first available
-            try:
-                transcript = transcript_list.find_transcript(['en'])
-            except:
-                transcript = next(iter(transcript_list))
-            transcript_text = " ".join([t['text'] for t in transcript.fetch()])
+            while pending is not None:
+                data = await pending
+                pending = None
+                items = data.get('items', [])
+                
+                next_token = data.get('nextPageToken')
+                wanted_after_page = max_videos - delivered - len(items) if max_videos else None
+                if next_token and (wanted_after_page is None or wanted_after_page > 0):
+                    # Prefetch while the caller works through this page
+                    pending = fetch_page(next_token, wanted_after_page)
+                
+                for item in items:
+                    video = self._parse_playlist_item(item)
+                    if video is None:
+                        continue
+                    if stop_at_video_id and video['id'] == stop_at_video_id:
+                        return
+                    if published_after and video['published_at']:
+                        if self._parse_timestamp(video['published_at']) <= published_after:
+                            return
+                    yield video
+                    delivered += 1
+                    if max_videos and delivered >= max_videos:
+                        return
+        finally:
+            if pending is not None:
+                pending.cancel()
+    
+    async def enrich_videos(self, video_ids: List[str], priority: str = PRIORITY_NORMAL) -> Dict[str, Dict]:
+        """Fetch duration, view count and caption availability for videos.
+        
+        IDs are grouped into videos.list calls of 50 (one quota unit each) and
+        a bounded number of batches run concurrently. Videos the API does not
+        return (private, deleted) are absent from the result.
+        
+        Returns:
+            Mapping of video ID to a compact record with ``duration_seconds``,
+            ``view_count`` and ``has_captions``
+        """
+        unique_ids = list(dict.fromkeys(video_ids))
+        batches = [unique_ids[i:i + 50] for i in range(0, len(unique_ids), 50)]
+        
+        async def fetch_batch(batch: List[str]) -> List[Dict]:
+            async with self._enrich_semaphore:
+                data = await self._api_get('videos', {
+                    'part': 'contentDetails,statistics',
+                    'fields': VIDEO_FIELDS,
+                    'id': ",".join(batch)
+                }, priority)
+                return data.get('items', [])
+        
+        enriched = {}
+        for items in await asyncio.gather(*[fetch_batch(batch) for batch in batches]):
+            for item in items:
+                content_details = item.get('contentDetails', {})
+                enriched[item['id']] = {
+                    'id': item['id'],
+                    'duration_seconds': self._parse_duration(content_details.get('duration', '')),
+                    'view_count': int(item.get('statistics', {}).get('viewCount', 0) or 0),
+                    'has_captions': content_details.get('caption') == 'true'
+                }
+        return enriched
+    
+    @staticmethod
+    def _parse_duration(value: str) -> Optional[int]:
+        """Convert an ISO 8601 duration (e.g. PT1H2M3S) to seconds"""
+        match = ISO_DURATION.fullmatch(value or '')
+        if not match:
+            return None
+        days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+        return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+    
+    def _parse_playlist_item(self, item: Dict) -> Optional[Dict]:
+        """Convert a playlistItems resource into our video dict"""
+        content_details = item.get('contentDetails', {})
+        video_id = content_details.get('videoId')
+        if not video_id:
+            return None
+            
+        snippet = item.get('snippet', {})
+        return {
+            'id': video_id,
+            'title': snippet.get('title', ''),
+            'description': snippet.get('description', ''),
+            'published_at': content_details.get('videoPublishedAt') or snippet.get('publishedAt', ''),
+            'thumbnail': snippet.get('thumbnails', {}).get('high', {}).get('url', '')
+        }
+    
+    @staticmethod
+    def _parse_timestamp(value: str) -> datetime:
+        """Parse an RFC 3339 timestamp as returned by the Data API"""
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    
+    async def get_video_transcript(self, video_id: str, timeout: Optional[float] = None) -> str:
+        """Get transcript for a YouTube video.
+        
+        The scrape runs in the transcript executor, limited by a per-process
+        semaphore and abandoned after ``timeout`` seconds. A scrape cannot be
+        interrupted once it has started, so it keeps its semaphore permit
+        until its thread actually finishes, not just until the caller gives up.
+        """
+        timeout = self.transcript_timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        await self._transcript_semaphore.acquire()
+        try:
+            future = self._transcript_executor.submit(self._fetch_transcript, video_id)
+        except Exception:
+            self._transcript_semaphore.release()
+            raise
+        self.transcripts_in_flight += 1
+        future.add_done_callback(lambda done: self._release_transcript_slot(loop))
+        try:
+            transcript_text = await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+            self.transcripts_fetched += 1
             return transcript_text
+        except asyncio.TimeoutError:
+            self.transcript_timeouts += 1
+            logger.warning(f"Timed out getting transcript for {video_id} after {timeout}s")
+            raise Exception("Timed out getting transcript for this video")
         except Exception as e:
+            self.transcript_errors += 1
             logger.error(f"Error getting transcript: {str(e)}")
             raise Exception("Could not get transcript for this video")
-
-# Create a singleton instance
-youtube_service = YouTubeService()
+    
+    def _release_transcript_slot(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Free a scrape's permit once its thread is done; called from that thread."""
+        def release():
+            self.transcripts_in_flight -= 1
+            self._transcript_semaphore.release()
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            # The loop has closed; there is nobody left to hand the permit to
+            pass
+    
+    def _fetch_transcript(self, video_id: str) -> str:
+        """Blocking transcript lookup; only call from the transcript executor."""
+        return " ".join([t['text'] for t in self._fetch_transcript_segments(video_id)])
+    
+    def _fetch_transcript_segments(self, video_id: str) -> List[Dict]:
+        """Read transcript segments from the local store, scraping on a miss."""
+        if self.transcript_store:
+            stored = self.transcript_store.find(video_id, languages=['en'])
+            if stored:
+                return stored[1]
+        
+        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+        # Try to get the English transcript, fallback to the first available
+        try:
+            transcript = transcript_list.find_transcript(['en'])
+        except:
+            transcript = next(iter(transcript_list))
+        segments = transcript.fetch()
+        
+        if self.transcript_store:
+            try:
+                self.transcript_store.put(video_id, transcript.language_code, transcript.is_generated, segments)
+            except OSError as e:
+                logger.warning(f"Could not store transcript for {video_id}: {str(e)}")
+        return segments
@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.ai_service import AIService
+from app.services.chat_service import ChatService
+from app.services.llm_backend import StubBackend
+from app.services.quota import PRIORITY_LOW, PRIORITY_NORMAL, QuotaExceededError
+from app.services.tokenizer import TokenCounter
+
+CHANNEL_ID = 'UC' + 'a' * 22
+
+
+class FakeYouTubeService:
+    """Serves one channel; calls at ``shed_priority`` fail as if over quota."""
+
+    transcript_timeout = 5
+
+    def __init__(self, shed_priority=None, videos=(), handles=None):
+        self.shed_priority = shed_priority
+        self.videos = list(videos)
+        # handle -> channel ID, known to known_channel_id once fetched
+        self.handles = handles or {}
+        self.resolved = {}
+        self.priorities = []
+
+    def known_channel_id(self, channel_identifier):
+        if channel_identifier.startswith('UC'):
+            return channel_identifier
+        return self.resolved.get(channel_identifier)
+
+    async def get_channel_info(self, channel_identifier, priority=PRIORITY_NORMAL, timer=None):
+        self.priorities.append(priority)
+        # Stay in flight long enough for a chat request to join
+        await asyncio.sleep(0.01)
+        if priority == self.shed_priority:
+            raise QuotaExceededError(f"Shed {priority} call")
+        channel_id = self.handles.get(channel_identifier, channel_identifier)
+        self.resolved[channel_identifier] = channel_id
+        return {'id': channel_id, 'title': 'Channel', 'description': '', 'videos': list(self.videos)}
+
+    @staticmethod
+    def uploads_playlist_id(channel_id):
+        return 'UU' + channel_id[2:]
+
+    async def get_channel_details(self, channel_identifier, priority=PRIORITY_NORMAL):
+        self.priorities.append(priority)
+        return {
+            'id': channel_identifier, 'title': 'Channel', 'description': '',
+            'uploads_playlist_id': self.uploads_playlist_id(channel_identifier)
+        }
+
+    async def get_channel_videos(self, playlist_id, max_results=10, priority=PRIORITY_NORMAL, **since):
+        # Nothing uploaded since the last crawl
+        return []
+
+    async def get_video_transcript(self, video_id):
+        await asyncio.sleep(0.01)
+        return f"Transcript of {video_id}"
+
+
+def make_chat_service(youtube, latency_ms=0):
+    ai_service = AIService(
+        token_counter=TokenCounter(),
+        backend=StubBackend(latency_ms=latency_ms, latency_distribution='fixed', tokens_per_second=0)
+    )
+    return ChatService(youtube, ai_service)
+
+
+def test_chat_joining_shed_low_priority_warmup_loads_at_its_own_priority():
+    youtube = FakeYouTubeService(shed_priority=PRIORITY_LOW)
+    chat_service = make_chat_service(youtube)
+
+    async def scenario():
+        warmup = asyncio.ensure_future(chat_service.warm_channel(CHANNEL_ID))
+        await asyncio.sleep(0)
+        assert chat_service.channel_warmups.in_flight(CHANNEL_ID)
+
+        result = await chat_service.process_message(CHANNEL_ID, "hello")
+        with pytest.raises(QuotaExceededError):
+            await warmup
+        return result
+
+    result = asyncio.run(scenario())
+
+    assert 'error' not in result
+    assert result['channel_info']['id'] == CHANNEL_ID
+    assert youtube.priorities == [PRIORITY_LOW, PRIORITY_NORMAL]
+
+
+def test_chat_does_not_retry_its_own_shed_load():
+    youtube = FakeYouTubeService(shed_priority=PRIORITY_NORMAL)
+    chat_service = make_chat_service(youtube)
+
+    result = asyncio.run(chat_service.process_message(CHANNEL_ID, "hello"))
+
+    assert 'error' in result
+    assert youtube.priorities == [PRIORITY_NORMAL]
+
+
+def test_background_transcripts_are_timed_apart_from_the_request():
+    youtube = FakeYouTubeService(videos=[{'id': 'video1', 'title': 'Video'}])
+    chat_service = make_chat_service(youtube)
+
+    async def scenario():
+        result = await chat_service.process_message(CHANNEL_ID, "hello")
+        stages = set(result['timings']['stages'])
+        for task in list(chat_service._sample_tasks.values()):
+            await task
+        return result, stages
+
+    result, stages = asyncio.run(scenario())
+
+    assert 'error' not in result
+    assert set(result['timings']['stages']) == stages
+    assert not any(name.startswith('transcript:') for name in stages)
+    assert chat_service.stage_totals['transcript']['count'] == 1
+    assert chat_service.timed_requests == 1
+
+
+def test_estimated_token_counts_are_not_cached_with_the_persona():
+    chat_service = make_chat_service(FakeYouTubeService())
+    assert not chat_service.ai_service.token_counter.is_loaded(chat_service.ai_service.model)
+
+    entry = chat_service._build_entry(
+        {'id': CHANNEL_ID, 'title': 'Channel', 'description': '', 'videos': []},
+        [{'title': 'Video', 'transcript': "word " * 50}]
+    )
+
+    assert entry['persona']['token_count'] is None
+    assert entry['persona']['excerpts']
+    assert all('tokens' not in excerpt for excerpt in entry['persona']['excerpts'])
+
+
+def test_socket_opened_on_an_unresolved_handle_reuses_the_cached_channel():
+    youtube = FakeYouTubeService(handles={'somehandle': CHANNEL_ID})
+    chat_service = make_chat_service(youtube)
+
+    async def scenario():
+        conversation_id, conversation = chat_service.open_conversation('@SomeHandle')
+        for message in ("one", "two", "three"):
+            events = [event async for event in chat_service.stream_turn(conversation_id, conversation, message)]
+            assert events[-1]['event'] == 'done'
+        return conversation
+
+    conversation = asyncio.run(scenario())
+
+    assert len(youtube.priorities) == 1
+    assert conversation['channel_id'] == CHANNEL_ID
+
+
+def test_turn_that_misses_the_deadline_is_not_kept(monkeypatch):
+    monkeypatch.setattr(settings, 'CHAT_DEADLINE_SECONDS', 0.2)
+    chat_service = make_chat_service(FakeYouTubeService(), latency_ms=500)
+
+    result = asyncio.run(chat_service.process_message(CHANNEL_ID, "hello"))
+
+    assert 'error' in result
+    assert result['seq'] == 0
+    assert chat_service.conversations[result['conversation_id']]['messages'] == []
+
+
+def test_incremental_refresh_retries_transcripts_for_a_basic_entry():
+    videos = [
+        {'id': 'video1', 'title': 'First', 'published_at': '2024-01-02T00:00:00Z'},
+        {'id': 'video2', 'title': 'Second', 'published_at': '2024-01-01T00:00:00Z'},
+    ]
+    chat_service = make_chat_service(FakeYouTubeService(videos=videos))
+    # The first transcript fetch failed, so only the basic tier was cached
+    stale_entry = chat_service._build_entry(
+        {'id': CHANNEL_ID, 'title': 'Channel', 'description': '', 'videos': videos}
+    )
+    assert stale_entry['context_tier'] == 'basic'
+
+    entry = asyncio.run(chat_service._refresh_channel(CHANNEL_ID, stale_entry))
+
+    assert chat_service.refreshes['incremental'] == 1
+    assert entry['context_tier'] == 'full'
+    assert sorted(sample['video_id'] for sample in entry['video_samples']) == ['video1', 'video2']
@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.quota import PRIORITY_NORMAL, QuotaExceededError, QuotaLedger
+
+
+def test_admitted_calls_hold_their_units_until_charged():
+    ledger = QuotaLedger(daily_limit=100, normal_priority_floor=0.1)
+    for _ in range(90):
+        ledger.admit('channels', PRIORITY_NORMAL)
+
+    # Nothing is charged yet, but the reserve is already spoken for
+    with pytest.raises(QuotaExceededError):
+        ledger.admit('channels', PRIORITY_NORMAL)
+    assert ledger.used() == 0
+
+    ledger.charge('channels')
+    ledger.refund('channels')
+    assert ledger.used() == 1
+    assert ledger.in_flight == 88
+    ledger.admit('channels', PRIORITY_NORMAL)
+
+
+def test_charges_are_saved_in_the_background(tmp_path):
+    state_path = tmp_path / 'quota.json'
+
+    async def scenario():
+        ledger = QuotaLedger(daily_limit=100, state_path=str(state_path))
+        ledger.admit('videos')
+        ledger.charge('videos')
+        await ledger.flush()
+        return ledger
+
+    ledger = asyncio.run(scenario())
+
+    assert json.loads(state_path.read_text()) == ledger.days
+    assert QuotaLedger(daily_limit=100, state_path=str(state_path)).used() == 1
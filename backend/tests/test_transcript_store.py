@@ -0,0 +1,54 @@
+from app.services.transcript_store import INDEX_FILE, TranscriptStore
+
+
+def make_segments(video_id, count=20):
+    return [
+        {'start': i * 2.5, 'duration': 2.5, 'text': f"so today in {video_id} we are talking about part {i}"}
+        for i in range(count)
+    ]
+
+
+def test_round_trip_across_reopen_before_and_after_training(tmp_path):
+    store = TranscriptStore(str(tmp_path), train_after=3)
+    for video_id in ('video1', 'video2', 'video3'):
+        store.put(video_id, 'en', False, make_segments(video_id))
+    # The third entry triggered training, so this one uses the dictionary
+    assert store.dict_id == 1
+    store.put('video4', 'en', True, make_segments('video4'))
+
+    reopened = TranscriptStore(str(tmp_path), train_after=3)
+
+    assert len(reopened) == 4
+    assert reopened.dict_id == 1
+    for video_id, generated in (('video1', False), ('video3', False), ('video4', True)):
+        assert reopened.get(video_id, 'en', generated) == make_segments(video_id)
+
+
+def test_torn_index_line_is_skipped_on_load(tmp_path):
+    store = TranscriptStore(str(tmp_path))
+    store.put('video1', 'en', False, make_segments('video1'))
+    with open(tmp_path / INDEX_FILE, 'a', encoding='utf-8') as index_file:
+        # An entry whose data never reached segments.dat, then a half-written line
+        index_file.write("video2\ten\t0\t100000\t50\t0\n")
+        index_file.write("video3\ten\t0\t12")
+
+    reopened = TranscriptStore(str(tmp_path))
+
+    assert len(reopened) == 1
+    assert reopened.find('video2') is None
+    assert reopened.get('video1', 'en', False) == make_segments('video1')
+
+
+def test_find_prefers_english_then_falls_back_to_any_language(tmp_path):
+    store = TranscriptStore(str(tmp_path))
+    store.put('video1', 'de', False, make_segments('video1'))
+    store.put('video2', 'de', False, make_segments('video2'))
+    store.put('video2', 'en', True, make_segments('video2'))
+
+    key, segments = store.find('video1', languages=['en'])
+    assert key == ('video1', 'de', False)
+    assert segments == make_segments('video1')
+
+    # A generated English transcript beats a manual one in another language
+    key, _ = store.find('video2', languages=['en'])
+    assert key == ('video2', 'en', True)
@@ -0,0 +1,21 @@
+import pytest
+
+from app.services.youtube_service import YouTubeService
+
+CHANNEL_ID = 'UC' + 'b' * 22
+
+
+@pytest.fixture
+def youtube():
+    service = YouTubeService(api_key='test-key')
+    yield service
+    service.close()
+
+
+def test_uc_prefixed_handle_is_not_taken_for_a_channel_id(youtube):
+    assert youtube.known_channel_id(CHANNEL_ID) == CHANNEL_ID
+    assert youtube.known_channel_id('@UCLA') is None
+
+    youtube.handle_map.set('UCLA', CHANNEL_ID)
+
+    assert youtube.known_channel_id('@UCLA') == CHANNEL_ID
@@ -40,6 +40,9 @@ function App() {
   const [isLoading, setIsLoading] = useState(false);
   const [channelInfo, setChannelInfo] = useState<ChannelInfo | null>(null);
   const [startupHint, setStartupHint] = useState<string | null>(null);
+  // The server keeps the conversation; we only tell it how much of it we have
+  const [conversationId, setConversationId] = useState<string | null>(null);
+  const [lastSeenSeq, setLastSeenSeq] = useState<number | null>(null);
 
   const bubbleBgUser = useColorModeValue('gray.50', 'gray.700');
   const bubbleBgBot = useColorModeValue('red.500', 'red.400');
@@ -185,8 +188,9 @@ function App() {
     setIsLoading(true);
 
     try {
-      // Send message to backend
-      const response = await fetch(`${API_BASE_URL}/api/chat`, {
+      // Send only the new message; the full history goes along only when the
+      // server has lost the conversation (409) and needs to rebuild it
+      const sendMessage = (withHistory: boolean) => fetch(`${API_BASE_URL}/api/chat`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -194,15 +198,24 @@ function App() {
         body: JSON.stringify({
           youtube_url: channelUrl,
           message: inputMessage,
-          chat_history: updatedMessages
-            .filter(msg => msg.sender === 'user' || msg.sender === 'bot')
-            .map(msg => ({
-              role: msg.sender === 'user' ? 'user' : 'assistant',
-              content: msg.text
-            }))
+          conversation_id: conversationId,
+          last_seen_seq: lastSeenSeq,
+          chat_history: withHistory
+            ? updatedMessages
+              .filter(msg => msg.sender === 'user' || msg.sender === 'bot')
+              .map(msg => ({
+                role: msg.sender === 'user' ? 'user' : 'assistant',
+                content: msg.text
+              }))
+            : []
         }),
       });
 
+      let response = await sendMessage(false);
+      if (response.status === 409) {
+        response = await sendMessage(true);
+      }
+
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
@@ -211,10 +224,25 @@ function App() {
       if (data.channel_info) {
         setChannelInfo(data.channel_info);
       }
+      if (data.seq != null) {
+        setConversationId(data.conversation_id);
+        setLastSeenSeq(data.seq);
+      }
+
+      // Turns made elsewhere (another tab) since our last reply go before our message
+      const missedMessages: Message[] = (data.missed_messages || []).map(
+        (msg: { role: string; content: string }, index: number) => ({
+          id: Date.now() + 3 + index,
+          text: msg.content,
+          sender: msg.role === 'user' ? 'user' : 'bot'
+        })
+      );
 
       // Remove loading message and add AI response
       setMessages(prev => ([
-        ...prev,
+        ...prev.filter(msg => msg.id !== newUserMessage.id),
+        ...missedMessages,
+        newUserMessage,
         {
           id: Date.now() + 2,
           text: data.response || "I'm not sure how to respond to that.",
@@ -293,6 +321,8 @@ function App() {
                 setChannelInfo(null);
                 setMessages([]);
                 setChannelUrl('');
+                setConversationId(null);
+                setLastSeenSeq(null);
               }}
             >
               ← Change Channel